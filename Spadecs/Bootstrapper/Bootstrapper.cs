@@ -25,14 +25,10 @@
 // SOFTWARE.
 
 using System;
-using System.Collections.Generic;
-using System.Text.Json;
-using System.Threading.Tasks;
 
 namespace Spadecs
 {
     using static PyBindings;
-    using static PyRegistry;
 
     public static unsafe class Bootstrapper
     {
@@ -40,23 +36,35 @@ namespace Spadecs
         {
         }
 
-        public static void OnLoad(string json)
+        public static void OnLoad(IntPtr table, int count, string manifest)
         {
-            PyFunctions = JsonSerializer.Deserialize<Dictionary<string, ulong>>(json);
-            Console.WriteLine(".NET CLR is running!");
+            PyRegistry.Initialize(table, count, manifest);
+            CommandBuffer.Initialize();
+            Log.Initialize();
+            Log.Info(nameof(OnLoad), ".NET CLR is running!");
 
             // Call into Python function to print a given string
             var result = MyPythonicFunction("This string has warp'ed from .NET to Python land :)");
-            Console.WriteLine(result == 123
-                              ? "All good! We are ready to rule the world."
-                              : "BUGCHECK: Integer is not matching!! Please report a bug.");
+            if (result == 123)
+            {
+                Log.Info(nameof(OnLoad), "All good! We are ready to rule the world.");
+            }
+            else
+            {
+                Log.Error(nameof(OnLoad), "BUGCHECK: Integer is not matching!! Please report a bug.");
+            }
 
             // Setup some events (testing purposes)
             static void PrePlayerConnect(object sender, PreConnectEventArgs e)
             {
-                Console.WriteLine("[dotnet] {0}({1})", nameof(PrePlayerConnect), e.Address);
+                Log.Debug(nameof(PrePlayerConnect), "{0}({1})", nameof(PrePlayerConnect), e.Address);
                 //e.AllowConnection = PyBool.False;
-                Console.WriteLine("Pre return: {0}", e.AllowConnection);
+                if (Store.TryGet("ban:" + e.Address, out var reason))
+                {
+                    Log.Info(nameof(PrePlayerConnect), "Refusing banned address {0} ({1})", e.Address, reason);
+                    e.AllowConnection = PyBool.False;
+                }
+                Log.Debug(nameof(PrePlayerConnect), "Pre return: {0}", e.AllowConnection);
                 // Test trackable object
                 DotNet_GetObjects();
                 //Console.WriteLine("Objects: {0}", objectsJson);
@@ -64,13 +72,15 @@ namespace Spadecs
             }
             static void PostPlayerConnect(object sender, PostPlayerConnectEventArgs e)
             {
-                Console.WriteLine("[dotnet] {0}({1}, #{2})", nameof(PostPlayerConnect), e.Address, e.ID);
-                Console.WriteLine("Post return: {0}", e.AllowConnection);
+                Log.Debug(nameof(PostPlayerConnect), "{0}({1}, #{2})", nameof(PostPlayerConnect), e.Address, e.ID);
+                Log.Debug(nameof(PostPlayerConnect), "Post return: {0}", e.AllowConnection);
                 byte pid = e.ID;
                 if (e.AllowConnection != PyBool.False)
                 {
                     // NOTE: The player doesn't seem to be kickable while in Limbo-state.
-                    Task.Run(() => TestClass.KickThePlayerAsync(pid));
+                    // The timer fires on the reactor thread, so calling into Python directly is fine.
+                    Log.Info(nameof(PostPlayerConnect), "(test) Player #{0} will be kicked in 30s...", pid);
+                    Scheduler.Schedule(TimeSpan.FromSeconds(30), () => CPlayer_KickByID(pid));
                 }
             }
             EventManager.PrePlayerConnect += PrePlayerConnect;
@@ -79,17 +89,7 @@ namespace Spadecs
 
         public static void OnUnload()
         {
-            Console.WriteLine(".NET CLR is unloading!");
-        }
-    }
-
-    internal static class TestClass
-    {
-        internal static async Task KickThePlayerAsync(byte pid)
-        {
-            Console.WriteLine("[dotnet](test) Player #{0} will be kicked in 30s...", pid);
-            await Task.Delay(TimeSpan.FromSeconds(30));
-            unsafe { CPlayer_KickByID(pid); }
+            Log.Info(nameof(OnUnload), ".NET CLR is unloading!");
         }
     }
 }
\ No newline at end of file
@@ -57,12 +57,17 @@ using Spadecs;
 
 internal static class Program
 {
+    // FileSystemWatcher raises several Changed events per save, wait for the file to settle before reloading.
+    private static readonly TimeSpan ReloadDebounce = TimeSpan.FromMilliseconds(250);
+
     private static async Task Main()
     {
+        Directory.CreateDirectory(CacheDirectory);
         foreach (var fileName in Directory.EnumerateFiles(AppContext.BaseDirectory, "*.csx", SearchOption.TopDirectoryOnly))
         {
             await ReloadFile(fileName);
         }
+        PruneCache();
         // TODO: Swap out this shitbug FSW API.
         var fileSystemWatcher = new FileSystemWatcher(AppContext.BaseDirectory, "*.csx")
         {
@@ -76,23 +81,74 @@ internal static class Program
 
     private static async void OnScriptFileChanged(object sender, FileSystemEventArgs e)
     {
-        await ReloadFile(e.FullPath);
+        // Coalesce bursts of change events: every new event cancels the pending one of the same file.
+        var cts = new CancellationTokenSource();
+        PendingReloads.AddOrUpdate(e.FullPath, cts, (_, previous) =>
+        {
+            previous.Cancel();
+            return cts;
+        });
+        try
+        {
+            await Task.Delay(ReloadDebounce, cts.Token).ConfigureAwait(false);
+        }
+        catch (TaskCanceledException)
+        {
+            return;
+        }
+        finally
+        {
+            PendingReloads.TryRemove(KeyValuePair.Create(e.FullPath, cts));
+        }
+        await ReloadFile(e.FullPath).ConfigureAwait(false);
     }
 
-    private static async Task<Compilation> ReloadFile(string fileName)
+    private static async Task ReloadFile(string fileName)
     {
-        Console.Out.WriteLine("Reloading script: {0}", fileName);
-        CompilationCache.TryGetValue(fileName, out var compilation);
+        // One reload at a time, so the same script version never gets built twice.
+        await ReloadLock.WaitAsync().ConfigureAwait(false);
         try
         {
-            return compilation = await ReloadCode(await ReadFile(fileName).ConfigureAwait(false), compilation, fileName);
+            var code = await ReadFile(fileName).ConfigureAwait(false);
+            if (String.IsNullOrEmpty(code)) return;
+            LoadedScripts.TryGetValue(fileName, out var current);
+            var sourceKey = GetSourceKey(code, fileName);
+            // The manifest of a previous build tells which #load/#r files the image depends on.
+            var manifest = await ReadCachedManifest(sourceKey).ConfigureAwait(false);
+            var hash = manifest != null ? GetCacheKey(sourceKey, manifest) : null;
+            if (hash != null && current?.Hash == hash)
+            {
+                return; // Nothing has changed.
+            }
+            Console.Out.WriteLine("Reloading script: {0}", fileName);
+            var image = hash != null ? await ReadCachedImage(hash).ConfigureAwait(false) : null;
+            if (image == null)
+            {
+                image = Compile(code, fileName, out manifest);
+                if (image == null) return;
+                hash = GetCacheKey(sourceKey, manifest);
+                if (hash != null)
+                {
+                    await WriteCachedImage(hash, image, sourceKey, manifest).ConfigureAwait(false);
+                }
+            }
+            var context = new ScriptLoadContext(Path.GetFileName(fileName), manifest.References);
+            if (!await Execute(context, image).ConfigureAwait(false))
+            {
+                context.Unload();
+                return;
+            }
+            // The previous version is no longer referenced by anyone, let the GC reclaim it.
+            current?.Context.Unload();
+            LoadedScripts[fileName] = new LoadedScript(hash, sourceKey, context);
+            if (current != null)
+            {
+                DeleteCachedImage(current, hash, sourceKey);
+            }
         }
         finally
         {
-            if (compilation != null)
-            {
-                CompilationCache[fileName] = compilation;
-            }
+            ReloadLock.Release();
         }
     }
 
@@ -110,22 +166,131 @@ internal static class Program
         }
     }
 
-    private static async Task<Compilation> ReloadCode(string code, Compilation compilation = null, string name = null)
+    private static string GetSourceKey(string code, string fileName)
     {
-        if (String.IsNullOrEmpty(code)) return null;
-        return await Execute(code, compilation, name).ConfigureAwait(false);
+        using var sha = SHA256.Create();
+        return ToHex(sha.ComputeHash(Encoding.UTF8.GetBytes(String.Join("\0", ReferenceKey, fileName, code))));
     }
 
-    [MethodImpl(MethodImplOptions.NoInlining)]
-    private static async Task<Compilation> Execute(string code, Compilation previous = null, string name = null)
+    private static string GetCacheKey(string sourceKey, ScriptManifest manifest)
+    {
+        // Files pulled in via #load/#r are compiled into (or bound by) the image too, so their contents are part of the key.
+        // Returns null if one of them can not be read (the image can not be reused then).
+        using var sha = SHA256.Create();
+        var sb = new StringBuilder(sourceKey);
+        foreach (var path in manifest.Loads.Concat(manifest.References))
+        {
+            byte[] content;
+            try
+            {
+                content = File.ReadAllBytes(path);
+            }
+            catch
+            {
+                return null;
+            }
+            sb.Append('\0').Append(path).Append('@').Append(ToHex(sha.ComputeHash(content)));
+        }
+        return ToHex(sha.ComputeHash(Encoding.UTF8.GetBytes(sb.ToString())));
+    }
+
+    private static string ToHex(byte[] hash) => String.Concat(hash.Select(b => b.ToString("x2")));
+
+    private static async Task<ScriptManifest> ReadCachedManifest(string sourceKey)
+    {
+        try
+        {
+            var json = await File.ReadAllBytesAsync(Path.Combine(CacheDirectory, sourceKey + ".json")).ConfigureAwait(false);
+            return JsonSerializer.Deserialize<ScriptManifest>(json);
+        }
+        catch
+        {
+            return null;
+        }
+    }
+
+    private static async Task<byte[]> ReadCachedImage(string hash)
+    {
+        try
+        {
+            return await File.ReadAllBytesAsync(Path.Combine(CacheDirectory, hash + ".dll")).ConfigureAwait(false);
+        }
+        catch
+        {
+            return null;
+        }
+    }
+
+    private static async Task WriteCachedImage(string hash, byte[] image, string sourceKey, ScriptManifest manifest)
+    {
+        try
+        {
+            // The image goes first, a manifest must never point at an image which is not there.
+            await WriteCacheFile(Path.Combine(CacheDirectory, hash + ".dll"), image).ConfigureAwait(false);
+            await WriteCacheFile(Path.Combine(CacheDirectory, sourceKey + ".json"), JsonSerializer.SerializeToUtf8Bytes(manifest)).ConfigureAwait(false);
+        }
+        catch (Exception ex)
+        {
+            Console.Error.WriteLine(ex);
+        }
+    }
+
+    private static async Task WriteCacheFile(string path, byte[] content)
+    {
+        // Write aside and then swap, so a half-written file is never picked up.
+        var tmpPath = path + ".tmp";
+        await File.WriteAllBytesAsync(tmpPath, content).ConfigureAwait(false);
+        File.Move(tmpPath, path, true);
+    }
+
+    private static void DeleteCachedImage(LoadedScript previous, string hash, string sourceKey)
+    {
+        // Every edit produces a new image, drop the one that has just been replaced so the cache does not grow forever.
+        try
+        {
+            if (previous.Hash != null && previous.Hash != hash)
+            {
+                File.Delete(Path.Combine(CacheDirectory, previous.Hash + ".dll"));
+            }
+            if (previous.SourceKey != sourceKey)
+            {
+                File.Delete(Path.Combine(CacheDirectory, previous.SourceKey + ".json"));
+            }
+        }
+        catch (Exception ex)
+        {
+            Console.Error.WriteLine(ex);
+        }
+    }
+
+    private static void PruneCache()
     {
-        //var syntaxTree = CSharpSyntaxTree.ParseText(SourceText.From(code), CSharpParseOptions.Default.WithKind(SourceCodeKind.Regular).WithLanguageVersion(LanguageVersion.Preview));
-        var eval = CSharpScript.Create<(IProtocol, IConnection)>(code, Options.WithFilePath(name));
-        var compilation = eval.GetCompilation();
-        if (previous != null)
+        // Whatever is not used by a loaded script (older builds, deleted or broken scripts, leftovers of a crash) goes away.
+        var live = new HashSet<string>(StringComparer.OrdinalIgnoreCase);
+        foreach (var script in LoadedScripts.Values)
         {
-            compilation = compilation.WithScriptCompilationInfo(compilation.ScriptCompilationInfo.WithPreviousScriptCompilation(previous));
+            if (script.Hash != null) live.Add(script.Hash + ".dll");
+            live.Add(script.SourceKey + ".json");
         }
+        foreach (var path in Directory.EnumerateFiles(CacheDirectory))
+        {
+            if (live.Contains(Path.GetFileName(path))) continue;
+            try
+            {
+                File.Delete(path);
+            }
+            catch (Exception ex)
+            {
+                Console.Error.WriteLine(ex);
+            }
+        }
+    }
+
+    [MethodImpl(MethodImplOptions.NoInlining)]
+    private static byte[] Compile(string code, string name, out ScriptManifest manifest)
+    {
+        manifest = null;
+        var compilation = CSharpScript.Create<(IProtocol, IConnection)>(code, Options.WithFilePath(name)).GetCompilation();
 
         var compileResult = compilation.GetDiagnostics();
         var compileErrors = compileResult.Where(d => d.IsWarningAsError || d.Severity == DiagnosticSeverity.Error).ToImmutableArray();
@@ -137,91 +302,158 @@ internal static class Program
             return null;
         }
 
-        using (var ms = new MemoryStream())
+        using var ms = new MemoryStream();
+        var emit = compilation.Emit(ms);
+        if (!emit.Success)
+        {
+            var emitResult = emit.Diagnostics;
+            var emitErrors = emitResult.Where(d => d.IsWarningAsError || d.Severity == DiagnosticSeverity.Error).ToImmutableArray();
+            var ex = new CompilationErrorException(String.Join(Environment.NewLine, emitErrors.Select(d => d.GetMessage())), emitErrors);
+            Console.Error.WriteLine(ex);
+            //throw ex;
+            return null;
+        }
+        manifest = new ScriptManifest
+        {
+            // Every tree other than the script itself came from a #load directive.
+            Loads = compilation.SyntaxTrees.Select(t => t.FilePath).Where(p => !String.IsNullOrEmpty(p) && p != name).Distinct().ToArray(),
+            References = compilation.DirectiveReferences.OfType<PortableExecutableReference>().Select(r => r.FilePath).Where(p => !String.IsNullOrEmpty(p)).Distinct().ToArray()
+        };
+        return ms.ToArray();
+    }
+
+    [MethodImpl(MethodImplOptions.NoInlining)]
+    private static async Task<bool> Execute(AssemblyLoadContext context, byte[] image)
+    {
+        try
         {
-            var emit = compilation.Emit(ms);
-            if (!emit.Success)
+            var assembly = context.LoadFromStream(new MemoryStream(image));
+            // Roslyn emits a script as "Submission#0" with a static "<Factory>(object[] submissionArray)" entry point.
+            var factory = assembly.GetType("Submission#0")?.GetMethod("<Factory>", BindingFlags.Public | BindingFlags.Static);
+            if (factory == null)
             {
-                var emitResult = emit.Diagnostics;
-                var emitErrors = emitResult.Where(d => d.IsWarningAsError || d.Severity == DiagnosticSeverity.Error).ToImmutableArray();
-                var ex = new CompilationErrorException(String.Join(Environment.NewLine, emitErrors.Select(d => d.GetMessage())), emitErrors);
-                Console.Error.WriteLine(ex);
-                //throw ex;
-                return null;
+                Console.Error.WriteLine("Script entry point is missing ({0})", assembly.FullName);
+                return false;
             }
+            // [0] is reserved for globals (we have none), [1] receives the submission itself.
+            var submissionArray = new object[2];
+            var result = await ((Task<(IProtocol protocol, IConnection connection)>)factory.Invoke(null, new object[] { submissionArray })!).ConfigureAwait(false);
+            var conn = result.connection;
+            if (conn != null)
+            {
+                var ret = conn.OnPrePlayerConnect(IPAddress.Loopback);
+                var b = ret.GetValueOrDefault(true); // Simulation... Server is going to let the player enter (by default), using true therefore
+                conn.OnPostPlayerConnect(ref b, IPAddress.Loopback, (byte)(Environment.TickCount % 0x20));
+            }
+            return true;
+        }
+        catch (Exception ex)
+        {
+            Console.Error.WriteLine(ex is TargetInvocationException { InnerException: { } inner } ? inner : ex);
+            return false;
+        }
+    }
 
-            ms.Seek(0, SeekOrigin.Begin);
-            //var binary = ms.ToArray();
-            //var assemblyLoadContext = new AssemblyLoadContext(null, isCollectible: true);
-            //var assembly = assemblyLoadContext.LoadFromStream(ms);
-            ScriptState<(IProtocol protocol, IConnection connection)> result;
-            try
+    private static string GetReferenceKey(IEnumerable<Assembly> references)
+    {
+        // Any rebuilt reference (e.g. Spadecs.dll) or compiler update invalidates every cached image.
+        var sb = new StringBuilder();
+        sb.Append(typeof(CSharpScript).Assembly.GetName().Version).Append(';').Append(Options.LanguageVersion);
+        foreach (var a in references)
+        {
+            sb.Append(';').Append(a.FullName).Append('@').Append(a.ManifestModule.ModuleVersionId);
+        }
+        return sb.ToString();
+    }
+
+    private sealed class LoadedScript
+    {
+        public LoadedScript(string hash, string sourceKey, AssemblyLoadContext context)
+        {
+            Hash = hash;
+            SourceKey = sourceKey;
+            Context = context;
+        }
+
+        public string Hash { get; }
+
+        public string SourceKey { get; }
+
+        public AssemblyLoadContext Context { get; }
+    }
+
+    private sealed class ScriptManifest
+    {
+        public string[] Loads { get; set; } = Array.Empty<string>();
+
+        public string[] References { get; set; } = Array.Empty<string>();
+    }
+
+    private sealed class ScriptLoadContext : AssemblyLoadContext
+    {
+        private readonly Dictionary<string, string> _references = new Dictionary<string, string>(StringComparer.OrdinalIgnoreCase);
+
+        public ScriptLoadContext(string name, IEnumerable<string> references) : base(name, isCollectible: true)
+        {
+            foreach (var path in references)
             {
-                result = await eval.RunAsync(null, ex => true).ConfigureAwait(false);
-                if (result.Exception != null)
+                try
                 {
-                    Console.Error.WriteLine(result.Exception);
-                    //throw result.Exception;
-                    return null;
+                    _references[AssemblyName.GetAssemblyName(path).Name!] = path;
                 }
-                var conn = result.ReturnValue.connection;
-                if (conn != null)
+                catch (Exception ex)
                 {
-                    var ret = conn.OnPrePlayerConnect(IPAddress.Loopback);
-                    var b = ret.GetValueOrDefault(true); // Simulation... Server is going to let the player enter (by default), using true therefore
-                    conn.OnPostPlayerConnect(ref b, IPAddress.Loopback, (byte)(Environment.TickCount % 0x20));
+                    Console.Error.WriteLine(ex);
                 }
-                return compilation;
             }
-            catch (CompilationErrorException ex)
-            {
-                Console.Error.WriteLine(ex);
-                //throw;
-                return null;
-            }
-
-            //assemblyLoadContext.Unload();
         }
 
-        //GC.Collect();
-        //GC.WaitForPendingFinalizers();
-        //GC.Collect();
+        protected override Assembly Load(AssemblyName assemblyName)
+        {
+            // Assemblies referenced via #r are only known to the compiler, load them here (so they get unloaded along with the script).
+            // Anything the host already has (e.g. Spadecs itself) must come from the default context, or the types would not match.
+            if (assemblyName.Name == null || !_references.TryGetValue(assemblyName.Name, out var path)) return null;
+            if (Default.Assemblies.Any(a => String.Equals(a.GetName().Name, assemblyName.Name, StringComparison.OrdinalIgnoreCase))) return null;
+            return LoadFromAssemblyPath(path);
+        }
     }
 
+    private static readonly string CacheDirectory = Path.Combine(AppContext.BaseDirectory, "csx-cache");
     private static readonly ScriptOptions Options;
-    private static readonly Dictionary<string, Compilation> CompilationCache;
+    private static readonly string ReferenceKey;
+    private static readonly Dictionary<string, LoadedScript> LoadedScripts = new Dictionary<string, LoadedScript>();
+    private static readonly ConcurrentDictionary<string, CancellationTokenSource> PendingReloads = new ConcurrentDictionary<string, CancellationTokenSource>();
+    private static readonly SemaphoreSlim ReloadLock = new SemaphoreSlim(1, 1);
 
     static Program()
     {
-        CompilationCache = new Dictionary<string, Compilation>();
         var thisLocation = Assembly.GetExecutingAssembly().Location;
         var locs = new HashSet<string>();
+        var references = new[]
+        {
+                typeof(string).GetTypeInfo().Assembly,
+                typeof(Console).GetTypeInfo().Assembly,
+                typeof(Color).GetTypeInfo().Assembly,
+                typeof(AesManaged).GetTypeInfo().Assembly,
+                typeof(File).GetTypeInfo().Assembly,
+                typeof(Enumerable).GetTypeInfo().Assembly,
+                typeof(HttpClient).GetTypeInfo().Assembly,
+                typeof(Regex).GetTypeInfo().Assembly,
+                typeof(Expression).GetTypeInfo().Assembly,
+                typeof(ConcurrentBag<>).GetTypeInfo().Assembly,
+                typeof(ImmutableHashSet).GetTypeInfo().Assembly,
+                typeof(Unsafe).GetTypeInfo().Assembly,
+                typeof(JsonSerializer).GetTypeInfo().Assembly,
+                typeof(IConnection).GetTypeInfo().Assembly
+            }.Concat(
+                from a in AppDomain.CurrentDomain.GetAssemblies()
+                let location = a.Location
+                where !a.IsDynamic && !String.IsNullOrEmpty(location) && location != thisLocation && File.Exists(location) && locs.Add(location)
+                select a
+            ).ToArray();
         Options = ScriptOptions.Default
                 .WithLanguageVersion(LanguageVersion.Preview)
-                .WithReferences(
-                    new[]
-                    {
-                        typeof(string).GetTypeInfo().Assembly,
-                        typeof(Console).GetTypeInfo().Assembly,
-                        typeof(Color).GetTypeInfo().Assembly,
-                        typeof(AesManaged).GetTypeInfo().Assembly,
-                        typeof(File).GetTypeInfo().Assembly,
-                        typeof(Enumerable).GetTypeInfo().Assembly,
-                        typeof(HttpClient).GetTypeInfo().Assembly,
-                        typeof(Regex).GetTypeInfo().Assembly,
-                        typeof(Expression).GetTypeInfo().Assembly,
-                        typeof(ConcurrentBag<>).GetTypeInfo().Assembly,
-                        typeof(ImmutableHashSet).GetTypeInfo().Assembly,
-                        typeof(Unsafe).GetTypeInfo().Assembly,
-                        typeof(JsonSerializer).GetTypeInfo().Assembly,
-                        typeof(IConnection).GetTypeInfo().Assembly
-                    }.Concat(
-                        from a in AppDomain.CurrentDomain.GetAssemblies()
-                        let location = a.Location
-                        where !a.IsDynamic && !String.IsNullOrEmpty(location) && location != thisLocation && File.Exists(location) && locs.Add(location)
-                        select a
-                    )
-                )
+                .WithReferences(references)
                 .WithImports(
                     "System",
                     "System.Collections",
@@ -259,5 +491,6 @@ internal static class Program
                 .WithSourceResolver(ScriptSourceResolver.Default.WithBaseDirectory(AppContext.BaseDirectory))
                 .WithMetadataResolver(ScriptMetadataResolver.Default.WithBaseDirectory(AppContext.BaseDirectory))
             ;
+        ReferenceKey = GetReferenceKey(references);
     }
 }
\ No newline at end of file
@@ -0,0 +1,114 @@
+﻿// This source file is part of Spadecs.
+// Spadecs is available through the world-wide-web at this URL:
+//   https://github.com/Conticop/Spadecs
+//
+// This source file is subject to the MIT license.
+//
+// Copyright (c) 2020
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to deal
+// in the Software without restriction, including without limitation the rights
+// to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+// copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in all
+// copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+using System.Numerics;
+using System.Runtime.InteropServices;
+
+namespace Spadecs
+{
+    using static PyBindings;
+
+    public enum ECommand : int
+    {
+        Kick = 0,
+        SendMessage = 1,
+        SetHealth = 2,
+        Teleport = 3
+    }
+
+    [StructLayout(LayoutKind.Sequential)]
+    internal unsafe struct Command
+    {
+        // Maximum size of a message (in bytes, UTF-8 encoded, including null terminator).
+        public const int MessageSize = 99;
+
+        public long Sequence;
+        public ECommand Action;
+        public int Value;
+        public Vector3 Position;
+        public byte ID;
+        public fixed byte Message[MessageSize];
+    }
+
+    // Must match dotnet_commands.CommandQueue (owned by Python).
+    [StructLayout(LayoutKind.Explicit)]
+    internal unsafe struct CommandQueue
+    {
+        [FieldOffset(0)]
+        public long EnqueuePos;
+
+        [FieldOffset(64)]
+        public long DequeuePos;
+
+        [FieldOffset(128)]
+        public long Mask;
+
+        [FieldOffset(136)]
+        public Command* Cells;
+    }
+
+    /// <summary>
+    /// Lock-free queue of actions to be applied by Python on the next world update.
+    /// Safe to use from any thread; all methods return false when the buffer is full (or not available yet).
+    /// </summary>
+    public static unsafe class CommandBuffer
+    {
+        private static CommandQueue* Queue;
+
+        internal static void Initialize()
+        {
+            Queue = (CommandQueue*)DotNet_GetCommandQueue();
+        }
+
+        public static bool Kick(byte playerID) => Enqueue(ECommand.Kick, playerID, 0, default, null);
+
+        public static bool SendMessage(byte playerID, string message) => Enqueue(ECommand.SendMessage, playerID, 0, default, message);
+
+        public static bool SetHealth(byte playerID, int health) => Enqueue(ECommand.SetHealth, playerID, health, default, null);
+
+        public static bool Teleport(byte playerID, Vector3 position) => Enqueue(ECommand.Teleport, playerID, 0, position, null);
+
+        private static bool Enqueue(ECommand action, byte playerID, int value, Vector3 position, string message)
+        {
+            var queue = Queue;
+            if (queue == null)
+            {
+                return false;
+            }
+            if (!NativeRing.TryReserve(&queue->EnqueuePos, queue->Mask, queue->Cells, out var cell, out var pos))
+            {
+                return false;
+            }
+            cell->Action = action;
+            cell->ID = playerID;
+            cell->Value = value;
+            cell->Position = position;
+            NativeRing.WriteString(message, cell->Message, Command.MessageSize);
+            NativeRing.Publish(cell, pos);
+            return true;
+        }
+    }
+}
\ No newline at end of file
@@ -65,11 +65,12 @@ namespace Spadecs
         private static void OnGetObjects(string objectsJson)
         {
             objectsJson += String.Empty; // Create a 'safe' copy.
-            Console.WriteLine(objectsJson);
+            // Called on every objects refresh, keep the log volume down.
+            Log.Write(ELogLevel.Debug, nameof(OnGetObjects), 100, "{0}", objectsJson);
             var deserialized = JsonSerializer.Deserialize<Dictionary<string, string[]>>(objectsJson);
             var protocol = deserialized!["PROTOCOL_OBJ"];
             var (obj_id, type) = (protocol[0], protocol[1]);
-            Console.WriteLine("{0} : {1}", obj_id, type);
+            Log.Write(ELogLevel.Debug, nameof(OnGetObjects) + ".Protocol", 100, "{0} : {1}", obj_id, type);
         }
     }
 }
\ No newline at end of file
@@ -0,0 +1,145 @@
+﻿// This source file is part of Spadecs.
+// Spadecs is available through the world-wide-web at this URL:
+//   https://github.com/Conticop/Spadecs
+//
+// This source file is subject to the MIT license.
+//
+// Copyright (c) 2020
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to deal
+// in the Software without restriction, including without limitation the rights
+// to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+// copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in all
+// copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+using System;
+using System.Collections.Concurrent;
+using System.Runtime.CompilerServices;
+using System.Runtime.InteropServices;
+using System.Threading;
+
+namespace Spadecs
+{
+    using static PyBindings;
+
+    public enum ELogLevel : int
+    {
+        Debug = 0,
+        Info = 1,
+        Warning = 2,
+        Error = 3
+    }
+
+    [StructLayout(LayoutKind.Sequential)]
+    internal unsafe struct LogRecord
+    {
+        // Sizes in bytes (UTF-8 encoded, including null terminator).
+        public const int EventSize = 32;
+        public const int MessageSize = 200;
+
+        public long Sequence;
+        public long Timestamp; // Unix time, in microseconds.
+        public ELogLevel Level;
+        public int Reserved;
+        public fixed byte Event[EventSize];
+        public fixed byte Message[MessageSize];
+    }
+
+    // Must match dotnet_log.LogQueue (owned by Python).
+    [StructLayout(LayoutKind.Explicit)]
+    internal unsafe struct LogQueue
+    {
+        [FieldOffset(0)]
+        public long EnqueuePos;
+
+        [FieldOffset(64)]
+        public long DequeuePos;
+
+        [FieldOffset(128)]
+        public long Mask;
+
+        [FieldOffset(136)]
+        public ELogLevel MinLevel;
+
+        [FieldOffset(144)]
+        public long Dropped;
+
+        // Last, the size of a pointer differs between 32-bit and 64-bit hosts.
+        [FieldOffset(152)]
+        public LogRecord* Cells;
+    }
+
+    /// <summary>
+    /// Structured logging into the ring shared with Python, written out by a background thread over there.
+    /// Safe to use from any thread and never blocks; records are dropped (and counted) when the ring is full.
+    /// </summary>
+    public static unsafe class Log
+    {
+        private static LogQueue* Queue;
+        private static readonly ConcurrentDictionary<string, StrongBox<long>> Counters = new ConcurrentDictionary<string, StrongBox<long>>();
+
+        internal static void Initialize()
+        {
+            Queue = (LogQueue*)DotNet_GetLogQueue();
+        }
+
+        public static bool IsEnabled(ELogLevel level)
+        {
+            var queue = Queue;
+            return queue != null && level >= queue->MinLevel;
+        }
+
+        public static bool Debug(string evt, string format, params object[] args) => Write(ELogLevel.Debug, evt, 1, format, args);
+
+        public static bool Info(string evt, string format, params object[] args) => Write(ELogLevel.Info, evt, 1, format, args);
+
+        public static bool Warning(string evt, string format, params object[] args) => Write(ELogLevel.Warning, evt, 1, format, args);
+
+        public static bool Error(string evt, string format, params object[] args) => Write(ELogLevel.Error, evt, 1, format, args);
+
+        /// <summary>
+        /// Writes a record; with <paramref name="sampleEvery"/> above 1, only every n-th record of the same event is kept.
+        /// The message is only formatted if the record passes the level and sampling checks.
+        /// </summary>
+        public static bool Write(ELogLevel level, string evt, int sampleEvery, string format, params object[] args)
+        {
+            var queue = Queue;
+            if (queue == null || level < queue->MinLevel)
+            {
+                return false;
+            }
+            if (sampleEvery > 1)
+            {
+                var counter = Counters.GetOrAdd(evt ?? String.Empty, _ => new StrongBox<long>());
+                if ((Interlocked.Increment(ref counter.Value) - 1) % sampleEvery != 0)
+                {
+                    return false;
+                }
+            }
+            var message = args is null || args.Length == 0 ? format : String.Format(format, args);
+            if (!NativeRing.TryReserve(&queue->EnqueuePos, queue->Mask, queue->Cells, out var cell, out var pos))
+            {
+                Interlocked.Increment(ref queue->Dropped);
+                return false;
+            }
+            cell->Timestamp = (DateTime.UtcNow.Ticks - DateTime.UnixEpoch.Ticks) / (TimeSpan.TicksPerMillisecond / 1000);
+            cell->Level = level;
+            NativeRing.WriteString(evt, cell->Event, LogRecord.EventSize);
+            NativeRing.WriteString(message, cell->Message, LogRecord.MessageSize);
+            NativeRing.Publish(cell, pos);
+            return true;
+        }
+    }
+}
\ No newline at end of file
@@ -0,0 +1,83 @@
+﻿// This source file is part of Spadecs.
+// Spadecs is available through the world-wide-web at this URL:
+//   https://github.com/Conticop/Spadecs
+//
+// This source file is subject to the MIT license.
+//
+// Copyright (c) 2020
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to deal
+// in the Software without restriction, including without limitation the rights
+// to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+// copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in all
+// copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+using System;
+using System.Text;
+using System.Threading;
+
+namespace Spadecs
+{
+    /// <summary>
+    /// Helpers for the bounded multi-producer rings owned by Python (see dotnet_commands and dotnet_log, consumed through dotnet_ring).
+    /// Every cell starts with an <see cref="long"/> sequence number, Python is the only consumer.
+    /// </summary>
+    internal static unsafe class NativeRing
+    {
+        internal static bool TryReserve<T>(long* enqueuePos, long mask, T* cells, out T* cell, out long pos) where T : unmanaged
+        {
+            pos = Volatile.Read(ref *enqueuePos);
+            while (true)
+            {
+                cell = cells + (pos & mask);
+                var diff = Volatile.Read(ref *(long*)cell) - pos;
+                if (diff == 0)
+                {
+                    var current = Interlocked.CompareExchange(ref *enqueuePos, pos + 1, pos);
+                    if (current == pos)
+                    {
+                        return true; // The cell is ours.
+                    }
+                    pos = current;
+                }
+                else if (diff < 0)
+                {
+                    return false; // Full, Python hasn't drained it yet.
+                }
+                else
+                {
+                    pos = Volatile.Read(ref *enqueuePos);
+                }
+            }
+        }
+
+        internal static void Publish<T>(T* cell, long pos) where T : unmanaged
+        {
+            // The consumer only reads the cell after seeing this sequence.
+            Volatile.Write(ref *(long*)cell, pos + 1);
+        }
+
+        internal static void WriteString(string value, byte* buffer, int size)
+        {
+            var length = 0;
+            if (!String.IsNullOrEmpty(value))
+            {
+                // Longer strings get truncated (on a character boundary).
+                Encoding.UTF8.GetEncoder().Convert(value, new Span<byte>(buffer, size - 1), true, out _, out length, out _);
+            }
+            buffer[length] = 0;
+        }
+    }
+}
\ No newline at end of file
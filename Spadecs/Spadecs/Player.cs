@@ -29,8 +29,6 @@ using System.Numerics;
 
 namespace Spadecs
 {
-    using static PyBindings;
-
     public interface IPlayer
     {
         public IPAddress Address { get; init; }
@@ -47,7 +45,10 @@ namespace Spadecs
 
         public byte ID { get; init; }
 
-        public void Kick();
+        /// <summary>
+        /// Queues a kick, applied by Python on the next world update. Returns false if it could not be queued.
+        /// </summary>
+        public bool Kick();
     }
 
     public unsafe class Player : IPlayer
@@ -66,7 +67,15 @@ namespace Spadecs
 
         public byte ID { get; init; }
 
-        public void Kick() => CPlayer_KickByID(ID);
+        public bool Kick()
+        {
+            if (CommandBuffer.Kick(ID))
+            {
+                return true;
+            }
+            Log.Warning("kick", "Could not queue kick of player #{0} ({1}), the command buffer is full or not available", ID, Name);
+            return false;
+        }
     }
 
     public abstract class BaseWeapon
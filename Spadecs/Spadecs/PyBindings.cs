@@ -24,39 +24,92 @@
 // OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 // SOFTWARE.
 
-using System.Collections.Generic;
+using System;
+using System.Collections.Concurrent;
 using System.Runtime.CompilerServices;
-
-using c_ubyte = System.Byte;
-using c_int32 = System.Int32;
-using c_char_p = System.String;
+using System.Text.Json;
 
 [assembly: InternalsVisibleTo("Spadecs.Boot")]
 
 namespace Spadecs
 {
-    using static PyRegistry;
-
-    public unsafe struct PyBindings
+    // Slots and their function pointers are generated into PyBindings.g.cs (see scripts/dotnet_slots.py).
+    public unsafe partial struct PyBindings
     {
-        public static readonly delegate* cdecl<c_char_p, c_int32> MyPythonicFunction;
-        public static readonly delegate* cdecl<c_ubyte, void> CPlayer_KickByID;
-        public static readonly delegate* cdecl<void> DotNet_GetObjects;
+        /// <summary>
+        /// Find the slot of a pyexport-ed function which has no declared PySlot, returns -1 if there is none.
+        /// Cache the slot rather than the pointer; Python is free to re-patch slots at runtime.
+        /// </summary>
+        public static int GetSlot(string name) => PyRegistry.GetSlot(name);
 
-        static PyBindings()
+        /// <summary>
+        /// Current function pointer of the slot (e.g. as returned by <see cref="GetSlot"/>).
+        /// </summary>
+        /// <exception cref="ArgumentOutOfRangeException">The slot is not part of the function table (or it isn't loaded yet).</exception>
+        public static IntPtr GetFunction(int slot)
         {
-            MyPythonicFunction = (delegate* cdecl<c_char_p, c_int32>)PyFunctions["my_pythonic_function"];
-            CPlayer_KickByID = (delegate* cdecl<c_ubyte, void>)PyFunctions["cplayer_kick_by_id"];
-            DotNet_GetObjects = (delegate* cdecl<void>)PyFunctions["dotnet_get_objects"];
+            if ((uint)slot >= (uint)PyRegistry.Count)
+            {
+                throw new ArgumentOutOfRangeException(nameof(slot), slot, String.Format("Function table has {0} slots", PyRegistry.Count));
+            }
+            return (IntPtr)PyRegistry.Functions[slot];
         }
     }
 
-    internal static class PyRegistry
+    internal static unsafe partial class PyRegistry
     {
-        internal static Dictionary<string, ulong> PyFunctions;
+        // Owned by Python (dotnet_const.FUNCTION_TABLE), indexed by slot.
+        internal static void** Functions;
+
+        internal static int Count;
+
+        private static readonly ConcurrentDictionary<string, int> Slots = new ConcurrentDictionary<string, int>();
 
         static PyRegistry()
         {
         }
+
+        internal static void Initialize(IntPtr table, int count, string manifestJson)
+        {
+            // [slot] = [name, signature], or null for a free slot.
+            var manifest = JsonSerializer.Deserialize<string[][]>(manifestJson);
+            if (manifest!.Length != count)
+            {
+                throw new InvalidOperationException(String.Format("Function table size mismatch (table has {0} slots, manifest has {1})", count, manifest.Length));
+            }
+            foreach (var (slot, (name, signature)) in Declared)
+            {
+                var entry = (int)slot < count ? manifest[(int)slot] : null;
+                if (entry is null || entry[0] != name || entry[1] != signature)
+                {
+                    throw new InvalidOperationException(String.Format("Function table slot {0} ({1}) mismatch (expected {2} {3}, got {4})", (int)slot, slot, name, signature, entry is null ? "nothing" : String.Join(" ", entry)));
+                }
+            }
+            Slots.Clear();
+            for (var slot = 0; slot < manifest.Length; ++slot)
+            {
+                if (manifest[slot] is { } entry)
+                {
+                    Slots[entry[0]] = slot;
+                }
+            }
+            Functions = (void**)table;
+            Count = count;
+        }
+
+        internal static int GetSlot(string name)
+        {
+            if (Slots.TryGetValue(name, out var slot))
+            {
+                return slot;
+            }
+            // Registered after load, ask Python.
+            slot = PyBindings.DotNet_GetSlot(name);
+            if (slot >= 0)
+            {
+                Slots[name] = slot;
+            }
+            return slot;
+        }
     }
 }
\ No newline at end of file
@@ -0,0 +1,92 @@
+﻿// This source file is part of Spadecs.
+// Spadecs is available through the world-wide-web at this URL:
+//   https://github.com/Conticop/Spadecs
+//
+// This source file is subject to the MIT license.
+//
+// Copyright (c) 2020
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to deal
+// in the Software without restriction, including without limitation the rights
+// to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+// copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in all
+// copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+// <auto-generated>
+// Generated by scripts/dotnet_slots.py, do not edit by hand.
+// </auto-generated>
+
+using System.Collections.Generic;
+
+using c_char_p = System.String;
+using c_int32 = System.Int32;
+using c_int64 = System.Int64;
+using c_ubyte = System.Byte;
+using c_uint32 = System.UInt32;
+using c_void_p = System.IntPtr;
+
+namespace Spadecs
+{
+    public enum PySlot : c_int32
+    {
+        MyPythonicFunction = 0,
+        CPlayer_KickByID = 1,
+        DotNet_GetObjects = 2,
+        DotNet_GetCommandQueue = 3,
+        DotNet_GetLogQueue = 4,
+        DotNet_TimerSchedule = 5,
+        DotNet_TimerCancel = 6,
+        DotNet_TimerReschedule = 7,
+        DotNet_StoreGet = 8,
+        DotNet_StoreSet = 9,
+        DotNet_StoreDelete = 10,
+        DotNet_GetSlot = 11
+    }
+
+    public unsafe partial struct PyBindings
+    {
+        public static delegate* cdecl<c_char_p, c_int32> MyPythonicFunction => (delegate* cdecl<c_char_p, c_int32>)PyRegistry.Functions[(int)PySlot.MyPythonicFunction];
+        public static delegate* cdecl<c_ubyte, void> CPlayer_KickByID => (delegate* cdecl<c_ubyte, void>)PyRegistry.Functions[(int)PySlot.CPlayer_KickByID];
+        public static delegate* cdecl<void> DotNet_GetObjects => (delegate* cdecl<void>)PyRegistry.Functions[(int)PySlot.DotNet_GetObjects];
+        public static delegate* cdecl<c_void_p> DotNet_GetCommandQueue => (delegate* cdecl<c_void_p>)PyRegistry.Functions[(int)PySlot.DotNet_GetCommandQueue];
+        public static delegate* cdecl<c_void_p> DotNet_GetLogQueue => (delegate* cdecl<c_void_p>)PyRegistry.Functions[(int)PySlot.DotNet_GetLogQueue];
+        public static delegate* cdecl<c_uint32, c_int64> DotNet_TimerSchedule => (delegate* cdecl<c_uint32, c_int64>)PyRegistry.Functions[(int)PySlot.DotNet_TimerSchedule];
+        public static delegate* cdecl<c_int64, c_ubyte> DotNet_TimerCancel => (delegate* cdecl<c_int64, c_ubyte>)PyRegistry.Functions[(int)PySlot.DotNet_TimerCancel];
+        public static delegate* cdecl<c_int64, c_uint32, c_ubyte> DotNet_TimerReschedule => (delegate* cdecl<c_int64, c_uint32, c_ubyte>)PyRegistry.Functions[(int)PySlot.DotNet_TimerReschedule];
+        public static delegate* cdecl<c_char_p, c_void_p, c_int32, c_int32> DotNet_StoreGet => (delegate* cdecl<c_char_p, c_void_p, c_int32, c_int32>)PyRegistry.Functions[(int)PySlot.DotNet_StoreGet];
+        public static delegate* cdecl<c_char_p, c_char_p, void> DotNet_StoreSet => (delegate* cdecl<c_char_p, c_char_p, void>)PyRegistry.Functions[(int)PySlot.DotNet_StoreSet];
+        public static delegate* cdecl<c_char_p, c_ubyte> DotNet_StoreDelete => (delegate* cdecl<c_char_p, c_ubyte>)PyRegistry.Functions[(int)PySlot.DotNet_StoreDelete];
+        public static delegate* cdecl<c_char_p, c_int32> DotNet_GetSlot => (delegate* cdecl<c_char_p, c_int32>)PyRegistry.Functions[(int)PySlot.DotNet_GetSlot];
+    }
+
+    internal static partial class PyRegistry
+    {
+        private static readonly Dictionary<PySlot, (string Name, string Signature)> Declared = new Dictionary<PySlot, (string Name, string Signature)>
+        {
+            [PySlot.MyPythonicFunction] = ("my_pythonic_function", "c_int32(c_char_p)"),
+            [PySlot.CPlayer_KickByID] = ("cplayer_kick_by_id", "void(c_ubyte)"),
+            [PySlot.DotNet_GetObjects] = ("dotnet_get_objects", "void()"),
+            [PySlot.DotNet_GetCommandQueue] = ("dotnet_get_command_queue", "c_void_p()"),
+            [PySlot.DotNet_GetLogQueue] = ("dotnet_get_log_queue", "c_void_p()"),
+            [PySlot.DotNet_TimerSchedule] = ("dotnet_timer_schedule", "c_int64(c_uint32)"),
+            [PySlot.DotNet_TimerCancel] = ("dotnet_timer_cancel", "c_ubyte(c_int64)"),
+            [PySlot.DotNet_TimerReschedule] = ("dotnet_timer_reschedule", "c_ubyte(c_int64,c_uint32)"),
+            [PySlot.DotNet_StoreGet] = ("dotnet_store_get", "c_int32(c_char_p,c_void_p,c_int32)"),
+            [PySlot.DotNet_StoreSet] = ("dotnet_store_set", "void(c_char_p,c_char_p)"),
+            [PySlot.DotNet_StoreDelete] = ("dotnet_store_delete", "c_ubyte(c_char_p)"),
+            [PySlot.DotNet_GetSlot] = ("dotnet_get_slot", "c_int32(c_char_p)")
+        };
+    }
+}
\ No newline at end of file
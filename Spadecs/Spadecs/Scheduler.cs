@@ -0,0 +1,96 @@
+﻿// This source file is part of Spadecs.
+// Spadecs is available through the world-wide-web at this URL:
+//   https://github.com/Conticop/Spadecs
+//
+// This source file is subject to the MIT license.
+//
+// Copyright (c) 2020
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to deal
+// in the Software without restriction, including without limitation the rights
+// to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+// copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in all
+// copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+using System;
+using System.Collections.Generic;
+
+using c_uint32 = System.UInt32;
+
+namespace Spadecs
+{
+    using static PyBindings;
+
+    /// <summary>
+    /// Schedules callbacks on the timer wheel owned by Python, which is advanced once per world update.
+    /// Callbacks always run on the reactor thread, in step with the game (use this instead of Task.Delay).
+    /// </summary>
+    public static unsafe class Scheduler
+    {
+        private static readonly Dictionary<long, Action> Callbacks = new Dictionary<long, Action>();
+
+        public static long Schedule(TimeSpan delay, Action callback)
+        {
+            if (callback is null)
+            {
+                throw new ArgumentNullException(nameof(callback));
+            }
+            // Hold the lock across the call, so the timer can't fire before its callback is registered.
+            lock (Callbacks)
+            {
+                var handle = DotNet_TimerSchedule(ToMilliseconds(delay));
+                Callbacks[handle] = callback;
+                return handle;
+            }
+        }
+
+        public static bool Cancel(long handle)
+        {
+            lock (Callbacks)
+            {
+                Callbacks.Remove(handle);
+                return DotNet_TimerCancel(handle) != 0;
+            }
+        }
+
+        public static bool Reschedule(long handle, TimeSpan delay) => DotNet_TimerReschedule(handle, ToMilliseconds(delay)) != 0;
+
+        private static c_uint32 ToMilliseconds(TimeSpan delay)
+        {
+            var ms = delay.TotalMilliseconds;
+            return ms <= 0 ? 0 : ms >= c_uint32.MaxValue ? c_uint32.MaxValue : (c_uint32)ms;
+        }
+
+        private static void OnTimer(long handle)
+        {
+            Action callback;
+            lock (Callbacks)
+            {
+                if (!Callbacks.Remove(handle, out callback))
+                {
+                    return;
+                }
+            }
+            try
+            {
+                callback();
+            }
+            catch (Exception ex)
+            {
+                Log.Error(nameof(Scheduler), "Timer #{0} callback failed: {1}", handle, ex);
+            }
+        }
+    }
+}
\ No newline at end of file
@@ -0,0 +1,93 @@
+﻿// This source file is part of Spadecs.
+// Spadecs is available through the world-wide-web at this URL:
+//   https://github.com/Conticop/Spadecs
+//
+// This source file is subject to the MIT license.
+//
+// Copyright (c) 2020
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software and associated documentation files (the "Software"), to deal
+// in the Software without restriction, including without limitation the rights
+// to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+// copies of the Software, and to permit persons to whom the Software is
+// furnished to do so, subject to the following conditions:
+//
+// The above copyright notice and this permission notice shall be included in all
+// copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+using System;
+using System.Text;
+
+namespace Spadecs
+{
+    using static PyBindings;
+
+    /// <summary>
+    /// Persistent key-value store provided by the bridge (bans, whitelists, stats, ...).
+    /// Reads are served from memory and writes are persisted in the background, so it is cheap enough for connect handlers.
+    /// </summary>
+    public static unsafe class Store
+    {
+        private const int StackBufferSize = 256;
+
+        public static bool TryGet(string key, out string value)
+        {
+            if (key is null)
+            {
+                throw new ArgumentNullException(nameof(key));
+            }
+            var stackBuffer = stackalloc byte[StackBufferSize];
+            var length = DotNet_StoreGet(key, (IntPtr)stackBuffer, StackBufferSize);
+            // Bigger values need a second round trip (retried in case the value grows in between).
+            while (length > StackBufferSize)
+            {
+                var buffer = new byte[length];
+                fixed (byte* ptr = buffer)
+                {
+                    var actual = DotNet_StoreGet(key, (IntPtr)ptr, buffer.Length);
+                    if (actual <= buffer.Length)
+                    {
+                        value = actual < 0 ? null : Encoding.UTF8.GetString(ptr, actual);
+                        return actual >= 0;
+                    }
+                    length = actual;
+                }
+            }
+            value = length < 0 ? null : Encoding.UTF8.GetString(stackBuffer, length);
+            return length >= 0;
+        }
+
+        public static string Get(string key, string defaultValue = null) => TryGet(key, out var value) ? value : defaultValue;
+
+        public static void Set(string key, string value)
+        {
+            if (key is null)
+            {
+                throw new ArgumentNullException(nameof(key));
+            }
+            if (value is null)
+            {
+                throw new ArgumentNullException(nameof(value));
+            }
+            DotNet_StoreSet(key, value);
+        }
+
+        public static bool Remove(string key)
+        {
+            if (key is null)
+            {
+                throw new ArgumentNullException(nameof(key));
+            }
+            return DotNet_StoreDelete(key) != 0;
+        }
+    }
+}
\ No newline at end of file
@@ -40,7 +40,12 @@ from subprocess import check_output
 from typing import List, Optional, Tuple
 
 sys.path.insert(1, abspath(dirname(__file__)))  # Fix dotnet_* imports.
+import dotnet_commands
 import dotnet_const
+import dotnet_log
+import dotnet_slots
+import dotnet_store
+import dotnet_timers
 
 
 def get_platform_name() -> str:
@@ -262,28 +267,35 @@ def LoadCoreCLR(assembly_path: str, assembly_name: str, class_name: str,
             nonlocal _CLR_handle, _CLR_domain
             error_code = _CLRLIB.coreclr_shutdown(_CLR_handle.value, _CLR_domain.value)
             if error_code != 0:
-                print(".NET CLR shutdown (code={})".format(error_code))
+                dotnet_log.error("clr_shutdown", ".NET CLR shutdown (code={})", error_code)
             dotnet_const.CLR_LIB = None
             dotnet_const.CLR_HANDLE = None
             dotnet_const.CLR_DOMAIN = None
             dotnet_const.FUNCTION_IMPORTER = None
             dotnet_const.FUNCTIONS.clear()
             dotnet_const.BINDINGS.clear()
-            dotnet_const.BINDINGS_JSON.clear()
+            dotnet_const.MANIFEST.clear()
+            dotnet_const.SLOT_NAMES.clear()
+            dotnet_const.RETIRED_BINDINGS.clear()
             dotnet_const.IMPORTED_FUNCTIONS.clear()
             dotnet_const.OBJECTS.clear()
+            dotnet_const.FUNCTION_TABLE = None
+            dotnet_commands.release()
+            dotnet_timers.release()
+            dotnet_store.release()
             del _CLRLIB, _CLR_handle, _CLR_domain, on_unload, error_code, \
                 dotnet_const.FUNCTION_IMPORTER, dotnet_const.FUNCTIONS, \
-                    dotnet_const.BINDINGS, dotnet_const.BINDINGS_JSON, \
-                        dotnet_const.IMPORTED_FUNCTIONS, dotnet_const.OBJECTS
+                    dotnet_const.BINDINGS, dotnet_const.MANIFEST, dotnet_const.SLOT_NAMES, \
+                        dotnet_const.RETIRED_BINDINGS, dotnet_const.IMPORTED_FUNCTIONS, dotnet_const.OBJECTS
 
     atexit.register(exit_handler)
     signal.signal(signal.SIGINT, exit_handler)
     signal.signal(signal.SIGTERM, exit_handler)
 
-    jsonData = json.dumps(dotnet_const.BINDINGS_JSON, separators=(',', ':'))
-    CFUNCTYPE(None, c_char_p)(on_load_func_ptr.value)(jsonData.encode("utf-8"))
-    del jsonData
+    manifest = json.dumps(dotnet_const.MANIFEST, separators=(',', ':'))
+    CFUNCTYPE(None, c_void_p, c_int32, c_char_p)(on_load_func_ptr.value)(
+        addressof(dotnet_const.FUNCTION_TABLE), len(dotnet_const.FUNCTION_TABLE), manifest.encode("utf-8"))
+    del manifest
 
     # noinspection PyUnresolvedReferences
     import dotnet_exports  # This import is required (in order to call .NET methods from Python).
@@ -291,45 +303,78 @@ def LoadCoreCLR(assembly_path: str, assembly_name: str, class_name: str,
     return GetManagedFunctionPointer
 
 
-def apply_script(protocol, connection, config):
+def setup_bridge(protocol, connection, config, store_path: Optional[str] = None) -> None:
+    """
+    Prepare everything the bridge needs before the .NET CLR gets loaded (bindings, function table, command buffer,
+    timers and store). Shared by apply_script and the load simulator, which stubs out the CLR instead.
+    """
+
     dotnet_const.PROTOCOL = protocol
     dotnet_const.CONNECTION = connection
     dotnet_const.CONFIG = config
     dotnet_const.FUNCTIONS = {}
     dotnet_const.BINDINGS = {}
-    dotnet_const.BINDINGS_JSON = {}
     dotnet_const.IMPORTED_FUNCTIONS = {}
+    table_size = len(dotnet_slots.SLOTS) + dotnet_slots.EXTRA_SLOTS
+    dotnet_const.FUNCTION_TABLE = (c_void_p * table_size)()
+    dotnet_const.MANIFEST = [None] * table_size
+    dotnet_const.SLOT_NAMES = {}
+    del table_size
+    dotnet_const.RETIRED_BINDINGS = []
     dotnet_const.OBJECTS = {}
     dotnet_const.MEMORY = weakref.WeakValueDictionary()
+    dotnet_commands.initialize()
+    dotnet_timers.initialize()
+    if not store_path:
+        store_path = dotnet_const.ENVIRON.get("DOTNETSTOREPATH") or join(dotnet_const.CURDIR, "dotnet_store.db")
+    dotnet_store.initialize(store_path)
     import dotnet_protocol
     import dotnet_connection
+    if "dotnet_bindings" in sys.modules:
+        # Bindings were registered into a previous function table, register them again into the fresh one.
+        importlib.reload(sys.modules["dotnet_bindings"])
     # noinspection PyUnresolvedReferences
     import dotnet_bindings  # This import is required (in order to register any bindings at all).
-    for fid, ft in dotnet_const.FUNCTIONS.items():
-        func = ft[0]
-        ftypes = ft[1:]
-        # print(func, *ftypes)
-        fref = CFUNCTYPE(*ftypes)(func)
-        dotnet_const.BINDINGS[fid] = fref
-        fptr = cast(fref, c_void_p).value
-        dotnet_const.BINDINGS_JSON[fid] = fptr
-    bootstrapper_path = join(dotnet_const.CURDIR, "dotnet", "net5.0", "Spadecs.Boot.dll")
-    LoadCoreCLR(bootstrapper_path, "Spadecs.Boot, Version=1.0.0.0", "Spadecs.Bootstrapper", runtime_version=(5, 0, 0))
+    missing = [slot.name for slot in dotnet_slots.SLOTS if dotnet_const.MANIFEST[slot.index] is None]
+    assert not missing, "Function table slots are not bound: {}".format(", ".join(missing))
+    del missing
+
+
+def get_bridge_classes() -> Tuple[type, type]:
+    """
+    (Re)build DotNetProtocol and DotNetConnection, once the runtime (or its stub) is in place.
+    """
+
+    import dotnet_protocol
+    import dotnet_connection
     # noinspection PyTypeChecker
     importlib.reload(dotnet_protocol)
     # noinspection PyTypeChecker
     importlib.reload(dotnet_connection)
-    import dotnet_exports
-    print("(Python to .NET) {} returned: {}".format(dotnet_exports.dotnet_get_test_string.__name__,
-                                                    dotnet_exports.dotnet_get_test_string()))
     return dotnet_protocol.DotNetProtocol, dotnet_connection.DotNetConnection
 
 
-print("[dotnet] Running Python {} ({}-bit) on {}.".format("3" if dotnet_const.PYTHON_3 else "2",
-                                                          "64" if dotnet_const.X64 else "32",
-                                                          get_platform_name()))
+def apply_script(protocol, connection, config):
+    setup_bridge(protocol, connection, config)
+    bootstrapper_path = join(dotnet_const.CURDIR, "dotnet", "net5.0", "Spadecs.Boot.dll")
+    LoadCoreCLR(bootstrapper_path, "Spadecs.Boot, Version=1.0.0.0", "Spadecs.Bootstrapper", runtime_version=(5, 0, 0))
+    protocol_cls, connection_cls = get_bridge_classes()
+    import dotnet_exports
+    dotnet_log.info("apply_script", "(Python to .NET) {} returned: {}", dotnet_exports.dotnet_get_test_string.__name__,
+                    dotnet_exports.dotnet_get_test_string())
+    return protocol_cls, connection_cls
+
+
+_log_level = dotnet_log.parse_level(dotnet_const.ENVIRON.get("DOTNETLOGLEVEL", "INFO"))
+dotnet_log.start(min_level=dotnet_log.ELogLevel.INFO if _log_level is None else _log_level)
+if _log_level is None:
+    dotnet_log.warning("startup", "Invalid DOTNETLOGLEVEL value {!r}, using info (expected debug/info/warning/error).",
+                       dotnet_const.ENVIRON["DOTNETLOGLEVEL"])
+del _log_level
+dotnet_log.info("startup", "Running Python {} ({}-bit) on {}.", "3" if dotnet_const.PYTHON_3 else "2",
+                "64" if dotnet_const.X64 else "32", get_platform_name())
 if not dotnet_const.PYTHON_3:
-    print("[dotnet] WARNING: Python 2 is no longer supported!")
+    dotnet_log.warning("startup", "Python 2 is no longer supported!")
 if __name__ == "__main__":
     class DummyType:
         pass
@@ -345,4 +390,4 @@ if __name__ == "__main__":
     protocol()
     connection()
     connection.on_connect(connection)
-    print("The End.")
+    dotnet_log.info("main", "The End.")
@@ -29,22 +29,25 @@ This file defines all Python functions (API) which are exported to .NET for cons
 """
 
 from ctypes import *
+import dotnet_commands
 import dotnet_const
+import dotnet_log
+import dotnet_store
+import dotnet_timers
 from dotnet_const import pyexport
 import json
-import pyspades
-from pyspades.constants import ERROR_KICKED
 
 
 @pyexport(c_int32, c_char_p)
 def my_pythonic_function(value: str) -> int:
-    print("(.NET to Python)", value)
+    dotnet_log.info("my_pythonic_function", "(.NET to Python) {}", value)
     return 123
 
 
 @pyexport(None, c_ubyte)
 def cplayer_kick_by_id(pid: int) -> None:
     # print("cplayer_kick_by_id", pid)
+    from pyspades.constants import ERROR_KICKED
     if pid in dotnet_const.PROTOCOL_OBJ.players:
         ply = dotnet_const.PROTOCOL_OBJ.players[pid]
         # print("Player:", ply)
@@ -58,3 +61,62 @@ def dotnet_get_objects() -> None:
     from dotnet_exports import dotnet_event_update_objects
     # This is a stupid fix (can't return a string directly), but I don't have time to do a cleaner implementation.
     dotnet_event_update_objects(json.dumps(dotnet_const.OBJECTS, separators=(',', ':')))
+
+
+@pyexport(c_void_p)
+def dotnet_get_command_queue() -> int:
+    return addressof(dotnet_commands.QUEUE)
+
+
+@pyexport(c_void_p)
+def dotnet_get_log_queue() -> int:
+    return addressof(dotnet_log.QUEUE)
+
+
+def _fire_dotnet_timer(handle: int) -> None:
+    # noinspection PyUnresolvedReferences
+    from dotnet_exports import dotnet_event_timer
+    dotnet_event_timer(handle)
+
+
+@pyexport(c_int64, c_uint32)
+def dotnet_timer_schedule(delay_ms: int) -> int:
+    return dotnet_timers.WHEEL.schedule(delay_ms / 1000.0, _fire_dotnet_timer)
+
+
+@pyexport(c_ubyte, c_int64)
+def dotnet_timer_cancel(handle: int) -> int:
+    return 1 if dotnet_timers.WHEEL.cancel(handle) else 0
+
+
+@pyexport(c_ubyte, c_int64, c_uint32)
+def dotnet_timer_reschedule(handle: int, delay_ms: int) -> int:
+    return 1 if dotnet_timers.WHEEL.reschedule(handle, delay_ms / 1000.0) else 0
+
+
+@pyexport(c_int32, c_char_p, c_void_p, c_int32)
+def dotnet_store_get(key: str, buffer: int, size: int) -> int:
+    # Strings can't be returned directly, so the value is copied into the caller's buffer instead.
+    # Returns the full size of the value (in bytes), or -1 if the key is missing.
+    value = dotnet_store.STORE.get(key)
+    if value is None:
+        return -1
+    data = value.encode("utf-8")
+    if buffer and size > 0:
+        memmove(buffer, data, min(len(data), size))
+    return len(data)
+
+
+@pyexport(None, c_char_p, c_char_p)
+def dotnet_store_set(key: str, value: str) -> None:
+    dotnet_store.STORE.set(key, value)
+
+
+@pyexport(c_ubyte, c_char_p)
+def dotnet_store_delete(key: str) -> int:
+    return 1 if dotnet_store.STORE.delete(key) else 0
+
+
+@pyexport(c_int32, c_char_p)
+def dotnet_get_slot(name: str) -> int:
+    return dotnet_const.SLOT_NAMES.get(name, -1)
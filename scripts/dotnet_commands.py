@@ -0,0 +1,142 @@
+# This source file is part of Spadecs.
+# Spadecs is available through the world-wide-web at this URL:
+#   https://github.com/Conticop/Spadecs
+#
+# This source file is subject to the MIT license.
+#
+# Copyright (c) 2020
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This file defines the command buffer which .NET uses to queue actions from any thread.
+Commands are drained and applied in one batch per world update, on the reactor thread.
+"""
+
+import enum
+from ctypes import *
+from typing import Optional
+
+import dotnet_log
+import dotnet_ring
+from dotnet_const import Vector3
+
+# Maximum size of a message (in bytes, UTF-8 encoded, including null terminator). Keeps a Command at 128 bytes.
+MESSAGE_SIZE = 99
+DEFAULT_CAPACITY = 1024
+
+
+class ECommand(enum.IntEnum):
+    KICK = 0
+    SEND_MESSAGE = 1
+    SET_HEALTH = 2
+    TELEPORT = 3
+
+
+class Command(Structure):
+    _fields_ = [
+        ("Sequence", c_int64),
+        ("Action", c_int32),
+        ("Value", c_int32),
+        ("Position", Vector3),
+        ("ID", c_ubyte),
+        ("Message", c_char * MESSAGE_SIZE)
+    ]
+
+
+class CommandQueue(Structure):
+    # Bounded multi-producer (.NET), single-consumer (Python) ring, must match Spadecs.CommandQueue.
+    # Producer and consumer positions live on separate cache lines.
+    _fields_ = [
+        ("EnqueuePos", c_int64),
+        ("_pad0", c_byte * 56),
+        ("DequeuePos", c_int64),
+        ("_pad1", c_byte * 56),
+        ("Mask", c_int64),
+        ("Cells", POINTER(Command))
+    ]
+
+
+QUEUE = None  # type: Optional[CommandQueue]
+_CELLS = None  # type: Optional[Array]
+
+
+def initialize(capacity: int = DEFAULT_CAPACITY) -> CommandQueue:
+    """
+    Allocate the command buffer (capacity must be a power of two).
+    """
+
+    global QUEUE, _CELLS
+    QUEUE, _CELLS = dotnet_ring.allocate(CommandQueue, Command, capacity)
+    return QUEUE
+
+
+def release() -> None:
+    global QUEUE, _CELLS
+    QUEUE = _CELLS = None
+
+
+def _kick(ply, cmd: Command) -> None:
+    from pyspades.constants import ERROR_KICKED
+    ply.disconnect(ERROR_KICKED)
+
+
+def _send_message(ply, cmd: Command) -> None:
+    ply.send_chat(cmd.Message.decode("utf-8", "replace"))
+
+
+def _set_health(ply, cmd: Command) -> None:
+    ply.set_hp(cmd.Value)
+
+
+def _teleport(ply, cmd: Command) -> None:
+    pos = cmd.Position
+    ply.set_location((pos.X, pos.Y, pos.Z))
+
+
+_HANDLERS = {
+    ECommand.KICK: _kick,
+    ECommand.SEND_MESSAGE: _send_message,
+    ECommand.SET_HEALTH: _set_health,
+    ECommand.TELEPORT: _teleport
+}
+
+
+def drain(protocol) -> int:
+    """
+    Apply all queued commands against the given protocol, returns the number of commands processed.
+    Must be called from the reactor thread (it is the only consumer).
+    """
+
+    queue = QUEUE
+    if queue is None:
+        return 0
+    players = protocol.players
+    count = 0
+    for cmd in dotnet_ring.consume(queue, Command):
+        count += 1
+        ply = players.get(cmd.ID)
+        handler = _HANDLERS.get(cmd.Action)
+        if ply and handler:
+            try:
+                handler(ply, cmd)
+            except Exception as ex:
+                dotnet_log.error("command", "Command {} for player #{} failed: {!r}", ECommand(cmd.Action).name,
+                                 cmd.ID, ex)
+    return count
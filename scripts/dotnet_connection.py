@@ -49,6 +49,8 @@ class DotNetConnection(CONNECTION):
             return CONNECTION.on_connect(self, *args, **kwargs)
         realResult = CONNECTION.on_connect(self, *args, **kwargs)
         pid = self.player_id
+        if pid is None:
+            return realResult  # Refused by the server itself (e.g. it is full), there is no player to report.
         # print("post_player_connect", type(pid), pid)
         postResult = dotnet_exports.dotnet_event_post_player_connect(ipAddress, pid)
         if postResult == 0:
@@ -32,6 +32,9 @@ from collections import namedtuple
 from ctypes import *
 from typing import Callable, Optional, Type
 
+import dotnet_slots
+from dotnet_slots import get_signature
+
 PLATFORM = sys.platform
 X64 = sys.maxsize > 2 ** 32
 PYTHON_3 = sys.version_info > (3, 0)
@@ -41,9 +44,17 @@ Runtime = namedtuple("Runtime", "name version path")
 
 FUNCTIONS = None  # type: dict
 BINDINGS = None  # type: dict
-BINDINGS_JSON = None  # type: dict
 IMPORTED_FUNCTIONS = None  # type: dict
 
+# [slot] = function pointer, shared with .NET (see Spadecs.PyRegistry).
+FUNCTION_TABLE = None  # type: Array
+# [slot] = (name, signature) or None, checked by .NET on load.
+MANIFEST = None  # type: list
+# [name] = slot, for every bound function.
+SLOT_NAMES = None  # type: dict
+# Binding thunks which were replaced at runtime (.NET might still be executing them).
+RETIRED_BINDINGS = None  # type: list
+
 # [string] = (id(value), str(type(value))).
 OBJECTS = None  # type: dict
 # [id(value)] = value.
@@ -59,6 +70,39 @@ CONNECTION = None
 CONFIG = None
 
 
+def _get_free_slot() -> int:
+    for slot in range(len(dotnet_slots.SLOTS), len(MANIFEST)):
+        if MANIFEST[slot] is None:
+            return slot
+    raise AssertionError("Function table is full ({} extra slots in use)".format(dotnet_slots.EXTRA_SLOTS))
+
+
+def bind_slot(name: str) -> int:
+    """
+    Create a native thunk for the registered pyexport function and store it into its function table slot.
+    Functions without a declared slot get one of the extra slots assigned.
+    Can be used at runtime to re-patch a slot, since .NET reads the table on every call.
+    """
+
+    ft = FUNCTIONS[name]
+    func, ftypes = ft[0], ft[1:]
+    signature = get_signature(*ftypes)
+    slot = SLOT_NAMES.get(name)
+    if slot is None:
+        declared = dotnet_slots.SLOTS_BY_NAME.get(name)
+        slot = declared.index if declared else _get_free_slot()
+        MANIFEST[slot] = (name, signature)
+        SLOT_NAMES[name] = slot
+    assert MANIFEST[slot][1] == signature, \
+        "Signature of {} can not change at runtime ({} != {})".format(name, signature, MANIFEST[slot][1])
+    fref = CFUNCTYPE(*ftypes)(func)
+    if name in BINDINGS:
+        RETIRED_BINDINGS.append(BINDINGS[name])
+    BINDINGS[name] = fref
+    FUNCTION_TABLE[slot] = cast(fref, c_void_p).value
+    return slot
+
+
 def track_object(value, name: Optional[str] = None) -> bool:
     """
     Makes the given object/value "trackable" across language boundaries (Python -> .NET and vice versa).
@@ -125,6 +169,8 @@ def pyexport(restype: Optional[Type['_CData']] = None, *argtypes: Type['_CData']
     The first argument is a return type (None means void; no return value).
     The rest is optional (specify argument types).
     Use c_<type>.
+    Functions declared in dotnet_slots.SLOTS must match their declared signature, others get an extra slot
+    (.NET finds those with PyBindings.GetSlot). Re-registering an already bound function will re-patch its slot.
     """
 
     def _unpack_args(*args) -> list:
@@ -132,6 +178,9 @@ def pyexport(restype: Optional[Type['_CData']] = None, *argtypes: Type['_CData']
 
     def pybinding(f):
         assert len(argtypes) == f.__code__.co_argcount
+        declared = dotnet_slots.SLOTS_BY_NAME.get(f.__name__)
+        assert declared is None or get_signature(declared.restype, *declared.argtypes) == get_signature(restype, *argtypes), \
+            "Signature of {} does not match its declaration in dotnet_slots".format(f.__name__)
 
         def pymethod(*args):
             assert len(args) == len(argtypes), "Invalid number of arguments"
@@ -150,6 +199,8 @@ def pyexport(restype: Optional[Type['_CData']] = None, *argtypes: Type['_CData']
         pymethod_string.__name__ = pymethod.__name__ = f.__name__
         func = pymethod_string if restype is c_char_p else pymethod
         FUNCTIONS[f.__name__] = (func, restype, *argtypes)
+        if FUNCTION_TABLE is not None:
+            bind_slot(f.__name__)
         return func
 
     return pybinding
@@ -52,3 +52,8 @@ def dotnet_event_post_player_connect(ip_address: str, pid: int) -> int:
 @pyimport(_ASSEMBLY, _CLASS, "OnGetObjects", None, c_char_p)
 def dotnet_event_update_objects(objects_json: str) -> None:
     pass  # The body of this function will be automagically replaced at runtime.
+
+
+@pyimport(_ASSEMBLY, "Spadecs.Scheduler", "OnTimer", None, c_int64)
+def dotnet_event_timer(handle: int) -> None:
+    pass  # The body of this function will be automagically replaced at runtime.
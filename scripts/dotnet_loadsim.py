@@ -0,0 +1,352 @@
+# This source file is part of Spadecs.
+# Spadecs is available through the world-wide-web at this URL:
+#   https://github.com/Conticop/Spadecs
+#
+# This source file is subject to the MIT license.
+#
+# Copyright (c) 2020
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Headless load simulator for the dotnet bridge.
+Drives DotNetProtocol/DotNetConnection against a stub .NET runtime (no .NET install is required),
+simulating N concurrent connections plus connect/disconnect/event traffic, and reports throughput
+and latency percentiles.
+
+Usage: python dotnet_loadsim.py --connections 32 --connect-rate 50 --duration 30
+"""
+
+import argparse
+import importlib
+import json
+import math
+import random
+import sys
+import time
+from os.path import abspath, dirname
+from ctypes import *
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(1, abspath(dirname(__file__)))  # Fix dotnet_* imports.
+import dotnet
+import dotnet_const
+import dotnet_slots
+import dotnet_store
+import dotnet_timers
+
+
+class StubProtocol:
+    """
+    Bare minimum of a server protocol, as seen by DotNetProtocol.
+    """
+
+    max_players = 32
+
+    def __init__(self, *args, **kwargs):
+        self.players = {}
+
+    def on_world_update(self):
+        pass
+
+
+class StubConnection:
+    """
+    Bare minimum of a server connection, as seen by DotNetConnection.
+    """
+
+    def __init__(self, protocol: StubProtocol, address: str, port: int):
+        self.protocol = protocol
+        self.address = (address, port)
+        self.player_id = None
+        self.disconnected = False
+
+    def on_connect(self, *args, **kwargs):
+        players = self.protocol.players
+        for pid in range(self.protocol.max_players):
+            if pid not in players:
+                self.player_id = pid
+                players[pid] = self
+                return None
+        # Server is full, refuse the connection.
+        self.disconnect()
+        return False
+
+    def disconnect(self, data: int = 0):
+        if self.disconnected:
+            return
+        self.disconnected = True
+        if self.player_id is not None and self.protocol.players.get(self.player_id) is self:
+            del self.protocol.players[self.player_id]
+
+    def kick(self, reason: Optional[str] = None, silent: bool = False):
+        self.disconnect()
+
+
+def _spin(seconds: float) -> None:
+    # Simulate time spent inside .NET handlers (busy-wait, the CLR would hold this thread too).
+    if seconds <= 0:
+        return
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def make_stub_importer(handler_cost: float = 0.0, deny_ratio: float = 0.0, rng: Optional[random.Random] = None,
+                       on_timer: Optional[Callable[[int], None]] = None) -> Callable[..., c_void_p]:
+    """
+    Create a stand-in for the .NET function importer (see dotnet.LoadCoreCLR), mimicking Spadecs.EventManager.
+    Handlers are handed out as native function pointers, so calls through dotnet_exports pay the same ctypes
+    marshalling as calls into .NET (the CLR's own transition cost is not included).
+    Handler cost is given in seconds, deny ratio is the share of pre-connect calls returning PyBool.False.
+    """
+
+    rng = rng or random.Random()
+    test_string = create_string_buffer(b"Hello from private .NET method")
+
+    def get_test_string() -> int:
+        # A callback can't return c_char_p, hand out the address of a buffer which outlives the call instead.
+        return addressof(test_string)
+
+    def on_pre_player_connect(ip_address: bytes) -> int:
+        _spin(handler_cost)
+        return 0 if deny_ratio > 0 and rng.random() < deny_ratio else 2
+
+    def on_post_player_connect(ip_address: bytes, pid: int) -> int:
+        _spin(handler_cost)
+        return 2
+
+    def on_get_objects(objects_json: bytes) -> None:
+        _spin(handler_cost)
+        json.loads(objects_json)
+
+    def on_timer_fired(handle: int) -> None:
+        _spin(handler_cost)
+        if on_timer is not None:
+            on_timer(handle)
+
+    # [(class name, method name)] = (handler, restype, *argtypes), as imported by dotnet_exports.
+    handlers = {
+        ("Spadecs.EventManager", "GetTestString"): (get_test_string, c_void_p),
+        ("Spadecs.EventManager", "OnPrePlayerConnect"): (on_pre_player_connect, c_ubyte, c_char_p),
+        ("Spadecs.EventManager", "OnPostPlayerConnect"): (on_post_player_connect, c_ubyte, c_char_p, c_ubyte),
+        ("Spadecs.EventManager", "OnGetObjects"): (on_get_objects, None, c_char_p),
+        ("Spadecs.Scheduler", "OnTimer"): (on_timer_fired, None, c_int64)
+    }
+    thunks = []  # dotnet_exports only keeps the raw pointers, the thunks must stay alive.
+
+    def import_function(class_name: str, method_name: str, assembly_name: Optional[str] = None) -> c_void_p:
+        handler, restype, *argtypes = handlers[(class_name, method_name)]
+        thunk = CFUNCTYPE(restype, *argtypes)(handler)
+        thunks.append(thunk)
+        return cast(thunk, c_void_p)
+
+    return import_function
+
+
+def install_stub_runtime(importer: Callable[..., c_void_p], protocol=StubProtocol, connection=StubConnection,
+                         config=None, store_path: str = ":memory:") -> Tuple[type, type]:
+    """
+    Same as dotnet.apply_script, except loading the .NET CLR is replaced with the given function importer stub.
+    Returns (DotNetProtocol, DotNetConnection) built on top of the given server classes.
+    """
+
+    dotnet.setup_bridge(protocol, connection, config, store_path)
+    dotnet_const.CLR_LIB = object()  # Anything truthy, so the bridge modules pick up dotnet_exports.
+    dotnet_const.FUNCTION_IMPORTER = importer
+    # Import dotnet_exports (again) against the stub, the way LoadCoreCLR does against the CLR.
+    sys.modules.pop("dotnet_exports", None)
+    importlib.import_module("dotnet_exports")
+    return dotnet.get_bridge_classes()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank method.
+    rank = int(math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def _arrivals(rng: random.Random, rate_per_tick: float) -> int:
+    whole = int(rate_per_tick)
+    return whole + (1 if rng.random() < rate_per_tick - whole else 0)
+
+
+class LoadSimulator:
+    def __init__(self, connections: int = 32, max_players: int = 32, connect_rate: float = 0.0,
+                 disconnect_rate: float = 0.0, event_rate: float = 0.0, timer_rate: float = 0.0,
+                 timer_delay: float = 5.0, tick_rate: float = 60.0, handler_cost: float = 0.0,
+                 deny_ratio: float = 0.0, realtime: bool = False, seed: Optional[int] = None,
+                 store_path: str = ":memory:"):
+        self.connections = connections
+        self.connect_rate = connect_rate
+        self.disconnect_rate = disconnect_rate
+        self.event_rate = event_rate
+        self.timer_rate = timer_rate
+        self.timer_delay = timer_delay
+        self.tick_rate = tick_rate
+        self.realtime = realtime
+        self.rng = random.Random(seed)
+        self.now = 0.0  # Simulated server time, in seconds.
+        StubProtocol.max_players = max_players
+        importer = make_stub_importer(handler_cost, deny_ratio, self.rng, self._on_timer)
+        protocol_cls, self.connection_cls = install_stub_runtime(importer, store_path=store_path)
+        if not realtime:
+            # Ticks run back to back, the timer wheel has to follow simulated time rather than the wall clock.
+            dotnet_timers.initialize(clock=lambda: self.now)
+        self.exports = sys.modules["dotnet_exports"]
+        # Timers get scheduled through the function table, the same entry point .NET uses.
+        slot = dotnet_slots.SLOTS_BY_NAME["dotnet_timer_schedule"]
+        self._timer_schedule = CFUNCTYPE(slot.restype, *slot.argtypes)(dotnet_const.FUNCTION_TABLE[slot.index])
+        self.protocol = protocol_cls()
+        self.open = []  # type: List[StubConnection]
+        self.samples = {
+            "connect": [], "disconnect": [], "event": [], "timer": [], "tick": []
+        }  # type: Dict[str, List[float]]
+        self.refused = 0
+        self.timers_fired = 0
+        self.overruns = 0
+        self._next_port = 32887
+
+    def connect(self) -> None:
+        self._next_port += 1
+        address = "10.{}.{}.{}".format(self.rng.randrange(256), self.rng.randrange(256), self.rng.randrange(1, 255))
+        conn = self.connection_cls(self.protocol, address, self._next_port)
+        start = time.perf_counter()
+        conn.on_connect()
+        self.samples["connect"].append(time.perf_counter() - start)
+        if conn.disconnected:
+            self.refused += 1
+        else:
+            self.open.append(conn)
+
+    def disconnect(self) -> None:
+        if not self.open:
+            return
+        idx = self.rng.randrange(len(self.open))
+        conn = self.open[idx]
+        self.open[idx] = self.open[-1]
+        self.open.pop()
+        start = time.perf_counter()
+        conn.disconnect()
+        self.samples["disconnect"].append(time.perf_counter() - start)
+
+    def event(self) -> None:
+        # Same round trip as dotnet_bindings.dotnet_get_objects.
+        start = time.perf_counter()
+        self.exports.dotnet_event_update_objects(json.dumps(dotnet_const.OBJECTS, separators=(',', ':')))
+        self.samples["event"].append(time.perf_counter() - start)
+
+    def timer(self) -> None:
+        delay_ms = int(self.rng.random() * self.timer_delay * 1000)
+        start = time.perf_counter()
+        self._timer_schedule(delay_ms)
+        self.samples["timer"].append(time.perf_counter() - start)
+
+    def _on_timer(self, handle: int) -> None:
+        self.timers_fired += 1
+
+    def tick(self) -> None:
+        start = time.perf_counter()
+        # Keep the requested concurrency topped up (up to the roster size), then layer the configured traffic on top.
+        for _ in range(max(0, min(self.connections, self.protocol.max_players) - len(self.open))):
+            self.connect()
+        for _ in range(_arrivals(self.rng, self.disconnect_rate / self.tick_rate)):
+            self.disconnect()
+        for _ in range(_arrivals(self.rng, self.connect_rate / self.tick_rate)):
+            self.connect()
+        for _ in range(_arrivals(self.rng, self.event_rate / self.tick_rate)):
+            self.event()
+        for _ in range(_arrivals(self.rng, self.timer_rate / self.tick_rate)):
+            self.timer()
+        self.protocol.on_world_update()
+        elapsed = time.perf_counter() - start
+        self.samples["tick"].append(elapsed)
+        if elapsed > 1.0 / self.tick_rate:
+            self.overruns += 1
+
+    def run(self, duration: float) -> float:
+        """
+        Simulate the given amount of server time (in seconds), returns the wall clock time it took.
+        """
+
+        ticks = int(duration * self.tick_rate)
+        interval = 1.0 / self.tick_rate
+        start = time.perf_counter()
+        for n in range(ticks):
+            self.now = (n + 1) * interval
+            self.tick()
+            if self.realtime:
+                delay = start + (n + 1) * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        return time.perf_counter() - start
+
+    def report(self, wall_time: float) -> str:
+        lines = ["{:<10} {:>9} {:>11} {:>9} {:>9} {:>9} {:>9}".format(
+            "op", "count", "ops/s", "p50 us", "p90 us", "p99 us", "max us")]
+        for name, values in self.samples.items():
+            values = sorted(values)
+            lines.append("{:<10} {:>9} {:>11.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}".format(
+                name, len(values), len(values) / wall_time if wall_time > 0 else 0.0,
+                percentile(values, 50) * 1e6, percentile(values, 90) * 1e6, percentile(values, 99) * 1e6,
+                (values[-1] if values else 0.0) * 1e6))
+        lines.append("wall time: {:.3f}s, refused connections: {}, tick overruns: {} (budget {:.1f} us)".format(
+            wall_time, self.refused, self.overruns, 1e6 / self.tick_rate))
+        lines.append("timers fired: {}, pending: {}".format(
+            self.timers_fired, len(dotnet_timers.WHEEL) if dotnet_timers.WHEEL is not None else 0))
+        return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless load simulator for the dotnet bridge.")
+    parser.add_argument("--connections", type=int, default=32, help="concurrent connections to keep open (capped by the roster)")
+    parser.add_argument("--max-players", type=int, default=32, help="server roster size")
+    parser.add_argument("--connect-rate", type=float, default=0.0, help="extra connects per second (spam)")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="disconnects per second")
+    parser.add_argument("--event-rate", type=float, default=0.0, help="object update events per second")
+    parser.add_argument("--timer-rate", type=float, default=0.0, help="timers scheduled (by .NET) per second")
+    parser.add_argument("--timer-delay", type=float, default=5.0, help="maximum timer delay, in seconds")
+    parser.add_argument("--tick-rate", type=float, default=60.0, help="reactor ticks per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="simulated server time in seconds")
+    parser.add_argument("--handler-cost", type=float, default=0.0, help="time spent per .NET handler, in us")
+    parser.add_argument("--deny-ratio", type=float, default=0.0, help="share of connects denied by .NET")
+    parser.add_argument("--realtime", action="store_true", help="pace ticks to wall clock time")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--store", default=":memory:", help="player store database (default: in memory)")
+    args = parser.parse_args(argv)
+    assert args.tick_rate > 0, "Tick rate must be positive"
+
+    sim = LoadSimulator(connections=args.connections, max_players=args.max_players,
+                        connect_rate=args.connect_rate, disconnect_rate=args.disconnect_rate,
+                        event_rate=args.event_rate, timer_rate=args.timer_rate, timer_delay=args.timer_delay,
+                        tick_rate=args.tick_rate,
+                        handler_cost=args.handler_cost / 1e6, deny_ratio=args.deny_ratio,
+                        realtime=args.realtime, seed=args.seed, store_path=args.store)
+    try:
+        wall_time = sim.run(args.duration)
+    finally:
+        dotnet_store.release()
+    print(sim.report(wall_time))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
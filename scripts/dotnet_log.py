@@ -0,0 +1,271 @@
+# This source file is part of Spadecs.
+# Spadecs is available through the world-wide-web at this URL:
+#   https://github.com/Conticop/Spadecs
+#
+# This source file is subject to the MIT license.
+#
+# Copyright (c) 2020
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This file defines the structured logging pipeline shared by Python and .NET.
+Producers only append records to memory, a background thread formats and writes them out,
+so a slow stdout (e.g. piped into a log collector) never stalls the reactor.
+"""
+
+import atexit
+import collections
+import enum
+import json
+import sys
+import threading
+import time
+from ctypes import *
+from typing import Optional, TextIO
+
+import dotnet_ring
+
+DEFAULT_CAPACITY = 4096
+FLUSH_INTERVAL = 0.05
+# Sizes in bytes (UTF-8 encoded, including null terminator). Keeps a LogRecord at 256 bytes.
+EVENT_SIZE = 32
+MESSAGE_SIZE = 200
+
+
+class ELogLevel(enum.IntEnum):
+    DEBUG = 0
+    INFO = 1
+    WARNING = 2
+    ERROR = 3
+
+
+class LogRecord(Structure):
+    _fields_ = [
+        ("Sequence", c_int64),
+        ("Timestamp", c_int64),  # Unix time, in microseconds.
+        ("Level", c_int32),
+        ("_reserved", c_int32),
+        ("Event", c_char * EVENT_SIZE),
+        ("Message", c_char * MESSAGE_SIZE)
+    ]
+
+
+class LogQueue(Structure):
+    # Bounded multi-producer (.NET), single-consumer (writer thread) ring, must match Spadecs.LogQueue.
+    _fields_ = [
+        ("EnqueuePos", c_int64),
+        ("_pad0", c_byte * 56),
+        ("DequeuePos", c_int64),
+        ("_pad1", c_byte * 56),
+        ("Mask", c_int64),
+        ("MinLevel", c_int32),
+        ("_pad2", c_int32),
+        ("Dropped", c_int64),
+        ("Cells", POINTER(LogRecord))  # Last, the size of a pointer differs between 32-bit and 64-bit hosts.
+    ]
+
+
+QUEUE = None  # type: Optional[LogQueue]
+_CELLS = None  # type: Optional[Array]
+# Records logged from Python: (timestamp, level, event, message, args). Appending to a deque is thread-safe.
+_PENDING = collections.deque()
+_COUNTERS = {}  # type: dict
+_MIN_LEVEL = ELogLevel.INFO
+_CAPACITY = DEFAULT_CAPACITY
+_DROPPED = 0
+_REPORTED_DROPS = [0, 0]  # [python, dotnet]
+_STREAM = None  # type: Optional[TextIO]
+_WRITER = None  # type: Optional[threading.Thread]
+_STOP = threading.Event()
+
+
+def start(stream: Optional[TextIO] = None, capacity: int = DEFAULT_CAPACITY,
+          min_level: ELogLevel = ELogLevel.INFO) -> None:
+    """
+    Allocate the shared ring (capacity must be a power of two) and start the background writer.
+    """
+
+    global QUEUE, _CELLS, _CAPACITY, _STREAM, _WRITER
+    if _WRITER is not None:
+        return
+    queue, cells = dotnet_ring.allocate(LogQueue, LogRecord, capacity)
+    QUEUE, _CELLS, _CAPACITY, _STREAM = queue, cells, capacity, stream
+    set_level(min_level)
+    _STOP.clear()
+    _WRITER = threading.Thread(target=_writer_loop, name="dotnet-log-writer", daemon=True)
+    _WRITER.start()
+    atexit.register(stop)
+
+
+def stop(timeout: Optional[float] = 1.0) -> None:
+    """
+    Stop the background writer, flushing everything which has been logged so far.
+    """
+
+    global _WRITER
+    writer = _WRITER
+    if writer is None:
+        return
+    _STOP.set()
+    writer.join(timeout)
+    if writer.is_alive():
+        return  # Still stuck writing (slow stream), it stays the only consumer and exits after its last flush.
+    _WRITER = None
+    flush()
+
+
+_LEVEL_ALIASES = {
+    "TRACE": ELogLevel.DEBUG,
+    "WARN": ELogLevel.WARNING,
+    "ERR": ELogLevel.ERROR,
+    "FATAL": ELogLevel.ERROR,
+    "CRITICAL": ELogLevel.ERROR
+}
+
+
+def parse_level(value: Optional[str]) -> Optional[ELogLevel]:
+    """
+    Parse a level name (case insensitive, a few common aliases are accepted) or number. Returns None if invalid.
+    """
+
+    value = (value or "").strip().upper()
+    if value in ELogLevel.__members__:
+        return ELogLevel[value]
+    if value in _LEVEL_ALIASES:
+        return _LEVEL_ALIASES[value]
+    if value.isdigit() and int(value) in ELogLevel._value2member_map_:
+        return ELogLevel(int(value))
+    return None
+
+
+def set_level(level: ELogLevel) -> None:
+    global _MIN_LEVEL
+    _MIN_LEVEL = ELogLevel(level)
+    if QUEUE is not None:
+        QUEUE.MinLevel = _MIN_LEVEL
+
+
+# Arguments of these types are safe to format later, from the writer thread.
+_PLAIN_TYPES = frozenset((str, bytes, int, float, bool, type(None)))
+
+
+def log(level: ELogLevel, event: str, message: str, *args, sample: int = 1) -> bool:
+    """
+    Queue a record (message is formatted with str.format, only if args are given).
+    Formatting is left to the writer thread, unless an argument is a live object (its __str__/__repr__ runs right away).
+    With sample > 1, only every n-th record of the same event is kept.
+    Never blocks; returns False when the record got filtered or dropped.
+    """
+
+    global _DROPPED
+    if level < _MIN_LEVEL:
+        return False
+    if sample > 1:
+        n = _COUNTERS.get(event, 0)
+        _COUNTERS[event] = n + 1
+        if n % sample:
+            return False
+    if len(_PENDING) >= _CAPACITY:
+        _DROPPED += 1
+        return False
+    if args and not all(type(arg) in _PLAIN_TYPES for arg in args):
+        message, args = _format_message(message, args), ()
+    _PENDING.append((time.time_ns() // 1000, level, event, message, args))
+    return True
+
+
+def debug(event: str, message: str, *args, sample: int = 1) -> bool:
+    return log(ELogLevel.DEBUG, event, message, *args, sample=sample)
+
+
+def info(event: str, message: str, *args, sample: int = 1) -> bool:
+    return log(ELogLevel.INFO, event, message, *args, sample=sample)
+
+
+def warning(event: str, message: str, *args, sample: int = 1) -> bool:
+    return log(ELogLevel.WARNING, event, message, *args, sample=sample)
+
+
+def error(event: str, message: str, *args, sample: int = 1) -> bool:
+    return log(ELogLevel.ERROR, event, message, *args, sample=sample)
+
+
+def _format_message(message: str, args: tuple) -> str:
+    try:
+        return message.format(*args)
+    except Exception as ex:
+        return "{} (bad format: {})".format(message, ex)
+
+
+def _format(timestamp: int, level: int, source: str, event: str, message: str) -> str:
+    seconds, micros = divmod(timestamp, 1000000)
+    return "time={}.{:06d}Z level={} source={} event={} msg={}\n".format(
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)), micros, ELogLevel(level).name.lower(),
+        source, event or "-", json.dumps(message, ensure_ascii=False))
+
+
+def _drain_queue(lines: list) -> None:
+    queue = QUEUE
+    if queue is None:
+        return
+    for record in dotnet_ring.consume(queue, LogRecord):
+        lines.append((record.Timestamp, _format(record.Timestamp, record.Level, "dotnet",
+                                                record.Event.decode("utf-8", "replace"),
+                                                record.Message.decode("utf-8", "replace"))))
+
+
+def _drain_pending(lines: list) -> None:
+    while _PENDING:
+        timestamp, level, event, message, args = _PENDING.popleft()
+        if args:
+            message = _format_message(message, args)
+        lines.append((timestamp, _format(timestamp, level, "python", event, message)))
+
+
+def flush() -> None:
+    """
+    Write out everything queued so far. Only meant for the writer thread (or after it has stopped).
+    """
+
+    lines = []
+    _drain_queue(lines)
+    _drain_pending(lines)
+    dropped = [_DROPPED, QUEUE.Dropped if QUEUE is not None else 0]
+    for source, count, reported in zip(("python", "dotnet"), dropped, _REPORTED_DROPS):
+        if count > reported:
+            now = time.time_ns() // 1000
+            lines.append((now, _format(now, ELogLevel.WARNING, source, "log_dropped",
+                                       "{} record(s) dropped, the log writer can't keep up".format(count - reported))))
+    _REPORTED_DROPS[:] = dropped
+    if not lines:
+        return
+    # Both sources are in order on their own, interleave them by time (the sort is stable).
+    lines.sort(key=lambda line: line[0])
+    stream = _STREAM or sys.stdout
+    try:
+        stream.write("".join(line for _, line in lines))
+        stream.flush()
+    except (OSError, ValueError):
+        pass  # Nowhere to write to (closed or broken stream), nothing else we can do.
+
+
+def _writer_loop() -> None:
+    while not _STOP.wait(FLUSH_INTERVAL):
+        flush()
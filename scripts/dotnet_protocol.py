@@ -24,7 +24,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import dotnet_commands
 import dotnet_const
+import dotnet_timers
 from dotnet_const import PROTOCOL, CONFIG
 
 if dotnet_const.CLR_LIB:
@@ -37,3 +39,9 @@ class DotNetProtocol(PROTOCOL):
         dotnet_const.track_object(self, "PROTOCOL_OBJ")
         dotnet_const.PROTOCOL_OBJ = self
         # print("[dotnet] Protocol initialized")
+
+    def on_world_update(self):
+        # Apply everything .NET queued up since the last tick (possibly from other threads), then run due timers.
+        dotnet_commands.drain(self)
+        dotnet_timers.advance()
+        PROTOCOL.on_world_update(self)
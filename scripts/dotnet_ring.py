@@ -0,0 +1,68 @@
+# This source file is part of Spadecs.
+# Spadecs is available through the world-wide-web at this URL:
+#   https://github.com/Conticop/Spadecs
+#
+# This source file is subject to the MIT license.
+#
+# Copyright (c) 2020
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+This file defines the helpers for the bounded rings shared with .NET (see dotnet_commands and dotnet_log).
+.NET producers use Spadecs.NativeRing, Python is the only consumer. Every cell starts with an int64 sequence number,
+every queue has EnqueuePos, DequeuePos, Mask and Cells fields.
+"""
+
+from ctypes import *
+from typing import Iterator, Tuple
+
+
+def allocate(queue_type: type, cell_type: type, capacity: int) -> Tuple[Structure, Array]:
+    """
+    Allocate an empty ring (capacity must be a power of two). Returns (queue, cells), keep both alive.
+    """
+
+    assert capacity > 0 and capacity & (capacity - 1) == 0, "Capacity must be a power of two"
+    cells = (cell_type * capacity)()
+    for i in range(capacity):
+        cells[i].Sequence = i
+    queue = queue_type()
+    queue.Mask = capacity - 1
+    queue.Cells = cast(cells, POINTER(cell_type))
+    return queue, cells
+
+
+def consume(queue: Structure, cell_type: type) -> Iterator[Structure]:
+    """
+    Yield a copy of every published cell, in order. Each cell is handed back to producers before its copy is yielded,
+    so stopping (or raising) half way never wedges the ring.
+    """
+
+    cells, mask, pos = queue.Cells, queue.Mask, queue.DequeuePos
+    # Bounded by capacity, so producers can't keep us in here forever.
+    for _ in range(mask + 1):
+        cell = cells[pos & mask]
+        if cell.Sequence != pos + 1:
+            return  # Empty (or the producer didn't publish yet).
+        # Copy out first, then hand the cell back to producers.
+        item = cell_type.from_buffer_copy(cell)
+        cell.Sequence = pos + mask + 1
+        pos += 1
+        queue.DequeuePos = pos
+        yield item
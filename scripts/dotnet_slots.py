@@ -0,0 +1,160 @@
+# This source file is part of Spadecs.
+# Spadecs is available through the world-wide-web at this URL:
+#   https://github.com/Conticop/Spadecs
+#
+# This source file is subject to the MIT license.
+#
+# Copyright (c) 2020
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This file is the single declaration of the function table shared between Python and .NET.
+Spadecs/Spadecs/PyBindings.g.cs is generated from it, run `python dotnet_slots.py` after editing SLOTS
+(`python dotnet_slots.py --check` verifies the generated file is up to date).
+Slots are stable: never reorder or reuse them, only append new ones.
+"""
+
+import sys
+from collections import namedtuple
+from ctypes import *
+from os.path import abspath, dirname, join
+from typing import Optional, Type
+
+Slot = namedtuple("Slot", "index name cs_name restype argtypes")
+
+SLOTS = (
+    Slot(0, "my_pythonic_function", "MyPythonicFunction", c_int32, (c_char_p,)),
+    Slot(1, "cplayer_kick_by_id", "CPlayer_KickByID", None, (c_ubyte,)),
+    Slot(2, "dotnet_get_objects", "DotNet_GetObjects", None, ()),
+    Slot(3, "dotnet_get_command_queue", "DotNet_GetCommandQueue", c_void_p, ()),
+    Slot(4, "dotnet_get_log_queue", "DotNet_GetLogQueue", c_void_p, ()),
+    Slot(5, "dotnet_timer_schedule", "DotNet_TimerSchedule", c_int64, (c_uint32,)),
+    Slot(6, "dotnet_timer_cancel", "DotNet_TimerCancel", c_ubyte, (c_int64,)),
+    Slot(7, "dotnet_timer_reschedule", "DotNet_TimerReschedule", c_ubyte, (c_int64, c_uint32)),
+    Slot(8, "dotnet_store_get", "DotNet_StoreGet", c_int32, (c_char_p, c_void_p, c_int32)),
+    Slot(9, "dotnet_store_set", "DotNet_StoreSet", None, (c_char_p, c_char_p)),
+    Slot(10, "dotnet_store_delete", "DotNet_StoreDelete", c_ubyte, (c_char_p,)),
+    Slot(11, "dotnet_get_slot", "DotNet_GetSlot", c_int32, (c_char_p,)),
+)
+# Room for pyexport-ed functions which are not declared above (.NET resolves those by name).
+EXTRA_SLOTS = 64
+
+SLOTS_BY_NAME = {s.name: s for s in SLOTS}
+assert [s.index for s in SLOTS] == list(range(len(SLOTS))), "Slots must be numbered 0..N-1, in order"
+assert len(SLOTS_BY_NAME) == len(SLOTS), "Slot names must be unique"
+
+# [ctypes type] = (signature name, C# type).
+_TYPES = {
+    None: ("void", "void"),
+    c_byte: ("c_byte", "System.SByte"),
+    c_ubyte: ("c_ubyte", "System.Byte"),
+    c_int32: ("c_int32", "System.Int32"),
+    c_uint32: ("c_uint32", "System.UInt32"),
+    c_int64: ("c_int64", "System.Int64"),
+    c_uint64: ("c_uint64", "System.UInt64"),
+    c_float: ("c_float", "System.Single"),
+    c_double: ("c_double", "System.Double"),
+    c_char_p: ("c_char_p", "System.String"),
+    c_void_p: ("c_void_p", "System.IntPtr")
+}
+
+
+def _type_name(t) -> str:
+    return _TYPES[t][0] if t in _TYPES else t.__name__
+
+
+def get_signature(restype: Optional[Type['_CData']] = None, *argtypes: Type['_CData']) -> str:
+    """
+    Build a signature string (e.g. "c_int32(c_char_p)") used by the function table manifest.
+    """
+
+    return "{}({})".format(_type_name(restype), ",".join(_type_name(t) for t in argtypes))
+
+
+CS_PATH = abspath(join(dirname(__file__), "..", "Spadecs", "Spadecs", "PyBindings.g.cs"))
+
+
+def generate_csharp() -> str:
+    with open(__file__, encoding="utf-8") as f:
+        license_lines = [line.rstrip("\n") for line in f][:25]
+    lines = ["//" + line[1:] for line in license_lines]
+    lines += [
+        "",
+        "// <auto-generated>",
+        "// Generated by scripts/dotnet_slots.py, do not edit by hand.",
+        "// </auto-generated>",
+        "",
+        "using System.Collections.Generic;",
+        ""
+    ]
+    used = sorted({t for s in SLOTS for t in (s.restype,) + s.argtypes if t is not None}, key=_type_name)
+    lines += ["using {} = {};".format(_TYPES[t][0], _TYPES[t][1]) for t in used]
+    lines += [
+        "",
+        "namespace Spadecs",
+        "{",
+        "    public enum PySlot : c_int32",
+        "    {",
+        ",\n".join("        {} = {}".format(s.cs_name, s.index) for s in SLOTS),
+        "    }",
+        "",
+        "    public unsafe partial struct PyBindings",
+        "    {"
+    ]
+    for s in SLOTS:
+        ptr = "delegate* cdecl<{}>".format(", ".join([_type_name(t) for t in s.argtypes] + [_type_name(s.restype)]))
+        lines.append("        public static {0} {1} => ({0})PyRegistry.Functions[(int)PySlot.{1}];".format(ptr, s.cs_name))
+    lines += [
+        "    }",
+        "",
+        "    internal static partial class PyRegistry",
+        "    {",
+        "        private static readonly Dictionary<PySlot, (string Name, string Signature)> Declared = "
+        "new Dictionary<PySlot, (string Name, string Signature)>",
+        "        {",
+        ",\n".join("            [PySlot.{}] = (\"{}\", \"{}\")".format(s.cs_name, s.name, get_signature(s.restype, *s.argtypes))
+                   for s in SLOTS),
+        "        };",
+        "    }",
+        "}"
+    ]
+    return "\n".join(lines)
+
+
+def main(argv) -> int:
+    source = generate_csharp()
+    try:
+        with open(CS_PATH, encoding="utf-8-sig") as f:
+            current = f.read()
+    except OSError:
+        current = None
+    if "--check" in argv:
+        if current != source:
+            print("{} is out of date, run `python {}`".format(CS_PATH, __file__))
+            return 1
+        return 0
+    if current != source:
+        with open(CS_PATH, "w", encoding="utf-8-sig", newline="\n") as f:
+            f.write(source)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
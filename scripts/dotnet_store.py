@@ -0,0 +1,133 @@
+# This source file is part of Spadecs.
+# Spadecs is available through the world-wide-web at this URL:
+#   https://github.com/Conticop/Spadecs
+#
+# This source file is subject to the MIT license.
+#
+# Copyright (c) 2020
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This file defines the persistent key-value store offered to scripts (bans, whitelists, stats, ...).
+Every entry is kept in memory, so reads on the connect path never touch the disk.
+Writes are applied in memory right away and persisted in batches by a background thread.
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+import dotnet_log
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+class PlayerStore:
+    def __init__(self, path: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        # Only ever used by one thread at a time (the writer, or whoever closes the store after it has stopped).
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS store (key TEXT PRIMARY KEY NOT NULL, value TEXT NOT NULL)")
+        self._data = dict(self._db.execute("SELECT key, value FROM store"))  # type: Dict[str, str]
+        # [key] = value, or None if the key got deleted.
+        self._dirty = {}  # type: Dict[str, Optional[str]]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._writer_loop, name="dotnet-store-writer", daemon=True)
+        self._writer.start()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self._data.get(key, default)
+
+    def set(self, key: str, value: str) -> None:
+        assert value is not None, "Can not store a None value (use delete)"
+        with self._lock:
+            self._data[key] = value
+            self._dirty[key] = value
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            del self._data[key]
+            self._dirty[key] = None
+            return True
+
+    def flush(self) -> int:
+        """
+        Persist all pending writes in a single transaction, returns the number of keys written.
+        """
+
+        with self._lock:
+            batch, self._dirty = self._dirty, {}
+        if not batch:
+            return 0
+        try:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR REPLACE INTO store (key, value) VALUES (?, ?)",
+                                 [(k, v) for k, v in batch.items() if v is not None])
+            self._db.executemany("DELETE FROM store WHERE key = ?", [(k,) for k, v in batch.items() if v is None])
+            self._db.execute("COMMIT")
+        except sqlite3.Error as ex:
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            with self._lock:
+                # Put the batch back, unless a newer write for the same key came in meanwhile.
+                for k, v in batch.items():
+                    self._dirty.setdefault(k, v)
+            dotnet_log.error("store", "Failed to persist {} key(s) into {}: {!r}", len(batch), self.path, ex)
+            return 0
+        return len(batch)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._writer.join()
+        self.flush()
+        self._db.close()
+
+    def _writer_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+STORE = None  # type: Optional[PlayerStore]
+
+
+def initialize(path: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> PlayerStore:
+    global STORE
+    release()  # Flush and close the previous store first, nothing else can reach it (or stop its writer) anymore.
+    STORE = PlayerStore(path, flush_interval)
+    return STORE
+
+
+def release() -> None:
+    global STORE
+    store, STORE = STORE, None
+    if store is not None:
+        store.close()
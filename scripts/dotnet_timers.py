@@ -0,0 +1,209 @@
+# This source file is part of Spadecs.
+# Spadecs is available through the world-wide-web at this URL:
+#   https://github.com/Conticop/Spadecs
+#
+# This source file is subject to the MIT license.
+#
+# Copyright (c) 2020
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This file defines the timer wheel which drives scheduled actions (from both Python and .NET).
+The wheel is advanced once per world update, so every callback fires on the reactor thread, in step with the game.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import dotnet_log
+
+# 4 levels of 64 slots: covers 64 ** 4 ticks (~77 hours at 60 ticks per second), longer delays wait in an overflow
+# bucket until they get within range.
+LEVEL_BITS = 6
+LEVELS = 4
+SLOTS = 1 << LEVEL_BITS
+SLOT_MASK = SLOTS - 1
+MAX_TICKS = (1 << (LEVEL_BITS * LEVELS)) - 1
+DEFAULT_RESOLUTION = 1.0 / 60.0
+
+
+class Timer:
+    __slots__ = ("handle", "expires", "callback", "slot")
+
+    def __init__(self, handle: int, expires: int, callback: Callable[[int], None]):
+        self.handle = handle
+        self.expires = expires
+        self.callback = callback
+        self.slot = None  # type: Optional[dict]
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel: schedule, cancel and reschedule are O(1), each tick costs O(1) plus due timers.
+    Scheduling is thread-safe, callbacks (which receive the timer handle) only ever run inside advance.
+    """
+
+    def __init__(self, resolution: float = DEFAULT_RESOLUTION, now: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        assert resolution > 0, "Resolution must be positive"
+        self.resolution = resolution
+        self.clock = clock
+        self.origin = clock() if now is None else now
+        self.tick = 0
+        self.wheels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]  # type: List[List[Dict[int, Timer]]]
+        self.timers = {}  # type: Dict[int, Timer]
+        self.overflow = {}  # type: Dict[int, Timer]
+        self._next_handle = 1
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def _to_ticks(self, delay: float) -> int:
+        # Always at least one tick away, so nothing fires within the tick it was scheduled in.
+        return max(1, int(round(delay / self.resolution)))
+
+    def _place(self, timer: Timer) -> None:
+        delta = timer.expires - self.tick
+        if delta > MAX_TICKS:
+            # Beyond the horizon of the top level, it gets placed again as the top level turns.
+            self.overflow[timer.handle] = timer
+            timer.slot = self.overflow
+            return
+        level = 0
+        while level < LEVELS - 1 and delta >= 1 << (LEVEL_BITS * (level + 1)):
+            level += 1
+        slot = self.wheels[level][(timer.expires >> (LEVEL_BITS * level)) & SLOT_MASK]
+        slot[timer.handle] = timer
+        timer.slot = slot
+
+    def _unlink(self, timer: Timer) -> None:
+        if timer.slot is not None:
+            del timer.slot[timer.handle]
+            timer.slot = None
+
+    def schedule(self, delay: float, callback: Callable[[int], None]) -> int:
+        """
+        Schedule the callback to run after the given delay (in seconds), returns the timer handle.
+        """
+
+        with self._lock:
+            handle = self._next_handle
+            self._next_handle += 1
+            timer = Timer(handle, self.tick + self._to_ticks(delay), callback)
+            self.timers[handle] = timer
+            self._place(timer)
+            return handle
+
+    def cancel(self, handle: int) -> bool:
+        with self._lock:
+            timer = self.timers.pop(handle, None)
+            if timer is None:
+                return False
+            self._unlink(timer)
+            return True
+
+    def reschedule(self, handle: int, delay: float) -> bool:
+        """
+        Move a pending timer to fire after the given delay (in seconds, counting from now).
+        """
+
+        with self._lock:
+            timer = self.timers.get(handle)
+            if timer is None:
+                return False
+            self._unlink(timer)
+            timer.expires = self.tick + self._to_ticks(delay)
+            self._place(timer)
+            return True
+
+    def _step(self) -> List[Timer]:
+        self.tick += 1
+        tick = self.tick
+        # Find how many upper levels rolled over, then cascade their current slot down (top-most first).
+        level = 1
+        while level < LEVELS and tick & ((1 << (LEVEL_BITS * level)) - 1) == 0:
+            level += 1
+        for upper in range(level - 1, 0, -1):
+            slot = self.wheels[upper][(tick >> (LEVEL_BITS * upper)) & SLOT_MASK]
+            if slot:
+                timers = list(slot.values())
+                slot.clear()
+                for timer in timers:
+                    self._place(timer)
+        if level == LEVELS and self.overflow:
+            timers = list(self.overflow.values())
+            self.overflow.clear()
+            for timer in timers:
+                self._place(timer)
+        slot = self.wheels[0][tick & SLOT_MASK]
+        if not slot:
+            return []
+        due = list(slot.values())
+        slot.clear()
+        for timer in due:
+            timer.slot = None
+            del self.timers[timer.handle]
+        return due
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """
+        Catch up with the given time (or the clock's), firing every due timer. Returns the number of callbacks run.
+        """
+
+        target = int(((self.clock() if now is None else now) - self.origin) / self.resolution)
+        fired = 0
+        while self.tick < target:
+            with self._lock:
+                due = self._step()
+            # Run callbacks outside of the lock, they are free to (re)schedule timers.
+            for timer in due:
+                fired += 1
+                try:
+                    timer.callback(timer.handle)
+                except Exception as ex:
+                    dotnet_log.error("timer", "Timer #{} callback failed: {!r}", timer.handle, ex)
+        return fired
+
+
+WHEEL = None  # type: Optional[TimerWheel]
+
+
+def initialize(resolution: float = DEFAULT_RESOLUTION, clock: Callable[[], float] = time.monotonic) -> TimerWheel:
+    global WHEEL
+    WHEEL = TimerWheel(resolution, clock=clock)
+    return WHEEL
+
+
+def release() -> None:
+    global WHEEL
+    WHEEL = None
+
+
+def advance() -> int:
+    """
+    Advance the timer wheel up to now. Must be called from the reactor thread.
+    """
+
+    wheel = WHEEL
+    if wheel is None:
+        return 0
+    return wheel.advance()